@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+from homoglypher.skeleton import Skeleton
+from homoglypher.process_data import FontTable
+import io
+import os
+import sys
+import time
+import multiprocessing
+
+# the normalizer used by this process; pool workers each get a copy once
+_skeleton = None
+
+def init_worker(table):
+    """give a pool worker its normalizer.
+
+    :param table: decimal--representative pairs
+    :type table: dict
+    """
+    global _skeleton
+    _skeleton = Skeleton(table)
+
+def font_groups(indir):
+    """collect the homoglyph groups of every per-font output in a directory.
+
+    :param indir: path, directory of per-font outputs
+    :type indir: str
+    :returns: homoglyph groups
+    :rtype: generator
+    """
+    fnames = sorted(
+        f for f in os.listdir(indir)
+        if f.startswith('.') is False and f.endswith(('.npz', '.csv', '.json'))
+    )
+    for count, fname in enumerate(fnames, 1):
+        yield from FontTable(fname, indir).homoglyph_groups()
+        if count % 100 == 0:
+            print(f"+ Loaded {count} of {len(fnames)} font(s)", file=sys.stderr)
+
+def load_skeleton(args):
+    """load a compiled normalizer, or build one and save it.
+
+    :param args: command line arguments
+    :type args: namespace args
+    :returns: the normalizer
+    :rtype: Skeleton
+    """
+    if args.table is not None and os.path.exists(args.table):
+        return Skeleton.load(args.table)
+    groups = font_groups(args.groups_dir) if args.groups_dir is not None else ()
+    skeleton = Skeleton.build(args.confusables, groups, args.min_fonts)
+    if args.table is not None:
+        skeleton.save(args.table)
+    return skeleton
+
+def process(skeleton, infile, outfile, mode):
+    """normalize a stream of text, or write out its flagged tokens.
+
+    :param skeleton: the normalizer
+    :type skeleton: Skeleton
+    :param infile: text to read
+    :type infile: file object
+    :param outfile: where to write
+    :type outfile: file object
+    :param mode: normalize or detect
+    :type mode: str
+    :returns: number of lines read and, when detecting, tokens flagged
+    :rtype: tup
+    """
+    n_lines, n_flagged = 0, 0
+    if mode == 'normalize':
+        # skeletons are character by character, so read in large blocks
+        while True:
+            text = infile.read(1 << 20)
+            if not text:
+                return n_lines, n_flagged
+            outfile.write(skeleton.normalize(text))
+            n_lines += text.count("\n")
+
+    for lineno, line in enumerate(infile, 1):
+        for token, skel, flags in skeleton.flag_line(line):
+            outfile.write(f"{lineno}\t{token}\t{skel}\t{','.join(flags)}\n")
+            n_flagged += 1
+        n_lines = lineno
+    return n_lines, n_flagged
+
+def process_shard(task):
+    """process one input file in a pool worker.
+
+    :param task: input path, output path, and mode
+    :type task: tup
+    :returns: input path, lines read, and tokens flagged
+    :rtype: tup
+    """
+    inpath, outpath, mode = task
+    with open(inpath, 'r', encoding='utf-8', errors='replace', newline='') as infile:
+        with open(outpath, 'w', encoding='utf-8', newline='') as outfile:
+            n_lines, n_flagged = process(_skeleton, infile, outfile, mode)
+    return inpath, n_lines, n_flagged
+
+def main(args):
+    """normalize text to skeletons, or flag mixed-script and spoofed tokens.
+
+    a single input (or stdin) is written to stdout. several inputs are shards,
+    split over a pool; each one's results are written to the output directory
+
+    :param args: command line arguments
+    :type args: namespace args
+    """
+    skeleton = load_skeleton(args)
+    start = time.perf_counter()
+    if len(args.infile) == 1:
+        path = args.infile[0]
+        stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace', newline='')
+        infile = stdin if path == '-' else open(path, 'r', encoding='utf-8', errors='replace', newline='')
+        outfile = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+        with infile:
+            n_lines, n_flagged = process(skeleton, infile, outfile, args.mode)
+        outfile.flush()
+    else:
+        os.makedirs(args.outdir, exist_ok=True)
+        suffix = ".tsv" if args.mode == 'detect' else ""
+        tasks = [
+            (path, os.path.join(args.outdir, os.path.basename(path) + suffix), args.mode)
+            for path in args.infile
+        ]
+        n_lines, n_flagged = 0, 0
+        with multiprocessing.Pool(args.n_cores, initializer=init_worker, initargs=(skeleton.table,)) as pool:
+            for count, (_, lines, flagged) in enumerate(pool.imap_unordered(process_shard, tasks), 1):
+                n_lines += lines
+                n_flagged += flagged
+                if count % 100 == 0:
+                    print(f"+ Processed {count} of {len(tasks)} shard(s)", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    summary = f"+ {n_lines} line(s) in {elapsed:.2f}s"
+    if args.mode == 'detect':
+        summary += f", {n_flagged} token(s) flagged"
+    print(summary, file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--infile',
+        type=str,
+        nargs='+',
+        default=['-'],
+        help="text file(s) to read (- for stdin); several are processed as shards"
+    )
+    parser.add_argument(
+        '--outdir',
+        type=str,
+        help="directory for per-shard results, when given several input files"
+    )
+    parser.add_argument(
+        '--mode',
+        type=str,
+        choices=['normalize', 'detect'],
+        default='detect',
+        help="write skeletons, or the line, token, skeleton, and flags of flagged tokens"
+    )
+    parser.add_argument(
+        '--confusables',
+        type=str,
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyboard_interface", "data", "unicode_confusables.json"),
+        help="confusables file (.json)"
+    )
+    parser.add_argument(
+        '--groups_dir',
+        type=str,
+        help="directory of per-font outputs whose homoglyph groups are added to the confusables"
+    )
+    parser.add_argument(
+        '--min_fonts',
+        type=int,
+        default=2,
+        help="fewest fonts two characters must share a glyph in to be joined"
+    )
+    parser.add_argument(
+        '--table',
+        type=str,
+        help="compiled translate table (.json): loaded if it exists, otherwise built and saved"
+    )
+    parser.add_argument(
+        '--n_cores',
+        type=int,
+        default=4
+    )
+    args = parser.parse_args()
+    main(args)
@@ -2,16 +2,85 @@
 # -*- coding: utf-8 -*-
 
 from argparse import ArgumentParser
-from homoglypher.glyph import Glyph
+from homoglypher.glyph import Glyph, GlyphBatch
+from homoglypher.process_data import save_coocc
+from homoglypher.outline import outline_groups
+from homoglypher.fuzzy import signature, near_groups
+from homoglypher.cache import RenderCache, font_hash
+from fontTools.ttLib import TTFont
+from PIL import ImageFont, features
 import os
+import json
+import queue
+import shutil
+import hashlib
 import multiprocessing
+from collections import OrderedDict
 from functools import partial
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from scipy.stats.contingency import crosstab
 
-def draw_char(char, typeface, size):
-    """generate a bitmap for a character from a font.
+# fonts loaded by this process, keyed by (typeface, size, mode). each pool 
+# worker fills its own copy once, so a font file is parsed once per worker 
+# rather than once per code point. workers that move between fonts keep only 
+# the most recently used ones
+_fonts = OrderedDict()
+MAX_FONTS = 16
+
+def load_font(typeface, size, mode='L'):
+    """load a font, reusing it if this process has already loaded it.
+
+    each rendering mode gets its own font: switching one font between 
+    antialiased and aliased rendering throws away freetype's glyph cache
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param size: size to draw
+    :type size: int
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :returns: the loaded font
+    :rtype: pil freetype font
+    """
+    key = (typeface, size, mode)
+    if key in _fonts:
+        _fonts.move_to_end(key)
+    else:
+        _fonts[key] = ImageFont.truetype(typeface, size)
+        if len(_fonts) > MAX_FONTS:
+            _fonts.popitem(last=False)
+    return _fonts[key]
+
+def init_worker(typeface, settings):
+    """load a font at every size when a pool worker starts.
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    """
+    for size, mode in settings:
+        load_font(typeface, size, mode)
+
+def digest_bitmap(bitmap):
+    """digest a bitmap.
+
+    the digest is a fixed-width hash of the raw bitmap bytes, paired with the 
+    bitmap dimensions. two characters share a key only if they share a bitmap
+
+    :param bitmap: a raw bitmap
+    :type bitmap: pil memory instance
+    :returns: width, height, and digest of the bitmap
+    :rtype: tup
+    """
+    width, height = bitmap.size
+    digest = hashlib.blake2b(bytes(bitmap), digest_size=16).digest()
+    return width, height, digest
+
+def draw_char(char, typeface, size, mode='L'):
+    """generate a bitmap for a character from a font and digest it.
 
     :param char: character to generate
     :type char: str
@@ -19,13 +88,149 @@ def draw_char(char, typeface, size):
     :type typeface: str
     :param size: size to draw
     :type size: int
-    :returns: base64 encoded bitmap of a character
-    :rtype: str
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :returns: width, height, and digest of a character's bitmap
+    :rtype: tup
     """
     g = Glyph(char)
-    return g.bitmap(typeface, size, 'b64')
+    font = load_font(typeface, size, mode)
+    return digest_bitmap(g.bitmap(font, size, 'raw', mode))
+
+def draw_chunk(codepoints, typeface, settings):
+    """generate bitmaps for a chunk of code points under every setting.
+
+    the chunk is drawn as one batch per (size, mode) pair
+
+    :param codepoints: unicode decimals to render
+    :type codepoints: range or list
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :returns: unicode decimal--bitmap digests pairs, one digest per setting
+    :rtype: list
+    """
+    batch = GlyphBatch(chr(dec) for dec in codepoints)
+    digests = []
+    for size, mode in settings:
+        font = load_font(typeface, size, mode)
+        bitmaps = batch.bitmap(font, size, 'bytes', mode)
+        digests.append([
+            (width, height, hashlib.blake2b(bitmap, digest_size=16).digest())
+            for (width, height), bitmap in zip(batch.sizes.tolist(), bitmaps)
+        ])
+    return list(zip(batch.dec.tolist(), zip(*digests)))
 
-def find_glyphs(typeface, size=10, n_cores=4):
+def sign_chunk(codepoints, typeface, size, mode='L', grid=16):
+    """generate bitmap digests and perceptual signatures for a chunk.
+
+    :param codepoints: unicode decimals to render
+    :type codepoints: range or list
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param size: size to draw
+    :type size: int
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :param grid: width and height of the signature thumbnail
+    :type grid: int
+    :returns: unicode decimal--bitmap digest--signature triples
+    :rtype: list
+    """
+    batch = GlyphBatch(chr(dec) for dec in codepoints)
+    bitmaps, sizes = batch.render(load_font(typeface, size, mode), size, mode)
+    signed = []
+    for dec, padded, (width, height) in zip(batch.dec.tolist(), bitmaps, sizes.tolist()):
+        bitmap = padded[:height, :width]
+        digest = hashlib.blake2b(bitmap.tobytes(), digest_size=16).digest()
+        signed.append((dec, (width, height, digest), signature(bitmap, grid)))
+    return signed
+
+def draw_task(task):
+    """generate bitmap digests for one chunk of one font.
+
+    errors are passed back rather than raised, so the parent knows which font 
+    to give up on
+
+    :param task: font name, typeface, settings, chunk index, and code points
+    :type task: tup
+    :returns: font name, chunk index, unicode decimal--bitmap digests pairs, 
+        and the error that stopped the chunk (None if it was drawn)
+    :rtype: tup
+    """
+    name, typeface, settings, idx, codepoints = task
+    try:
+        return name, idx, draw_chunk(codepoints, typeface, settings), None
+    except Exception as error:
+        return name, idx, None, repr(error)
+
+def chunk_codepoints(codepoints, chunksize):
+    """split code points into chunks for the rendering pool.
+
+    slicing keeps a range a range, so a full scan never materializes every 
+    code point in the parent process
+
+    :param codepoints: unicode decimals to render
+    :type codepoints: range or list
+    :param chunksize: number of code points per chunk
+    :type chunksize: int
+    :returns: chunks of code points
+    :rtype: generator
+    """
+    for start in range(0, len(codepoints), chunksize):
+        yield codepoints[start:start + chunksize]
+
+def get_codepoints(typeface, full_scan=False):
+    """find the code points to render for a font.
+
+    by default, only the code points in the font's character map are returned. 
+    a full scan returns every possible unicode code point instead
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param full_scan: whether to scan every code point
+    :type full_scan: bool
+    :returns: unicode decimals to render
+    :rtype: range or list
+    """
+    if full_scan:
+        return range(0x10ffff)
+
+    font = TTFont(typeface, lazy=True, fontNumber=0)
+    cmap = font.getBestCmap() or {}
+    font.close()
+    return sorted(dec for dec in cmap if dec < 0x10ffff)
+
+def get_render_set(typeface, full_scan=False, outline_pass=True):
+    """find the code points that need drawing for a font.
+
+    the outline pass groups code points that map to the same glyph, or to 
+    glyphs with identical outlines, without drawing anything. only one code 
+    point per group is drawn; the rest share its bitmap. the group drawn with
+    the notdef glyph (e.g. every unmapped code point in a full scan) would be
+    skipped once drawn, so it's left out altogether
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param full_scan: whether to scan every code point
+    :type full_scan: bool
+    :param outline_pass: whether to group code points by outline first
+    :type outline_pass: bool
+    :returns: unicode decimals to draw and the outline groups (None without 
+        the outline pass)
+    :rtype: tup
+    """
+    codepoints = get_codepoints(typeface, full_scan)
+    if not outline_pass:
+        return codepoints, None
+    members = outline_groups(typeface, codepoints, shaped=features.check('raqm'))
+    if members is None:
+        return codepoints, None
+    members = members.without_notdef()
+    return members.reps, members
+
+def find_glyphs(typeface, size=10, n_cores=4, full_scan=False, chunksize=2048, mode='L', outline_pass=True, cache=None):
     """generate glyphs for all characters in a font and group them by glyph.
 
     :param typeface: filepath, a typeface to use
@@ -34,63 +239,217 @@ def find_glyphs(typeface, size=10, n_cores=4):
     :type size: int
     :param n_cores: cores to use in multiprocessing
     :type n_cores: int
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points sent to a worker at a time
+    :type chunksize: int
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param cache: bitmap digests from earlier runs
+    :type cache: RenderCache
     :returns: table of glyph--unicode decimal pairs
     :rtype: pandas dataframe
     """
-    # compile draw_char() as a partial function and send to the pool, then 
-    # churn through every possible unicode code point
-    to_pool = partial(draw_char, typeface=typeface, size=size)
-    with multiprocessing.Pool(n_cores) as pool:
-        print("+ Generating bitmaps")
-        bitmaps = pool.map(to_pool, [chr(i) for i in range(0x10ffff)])
-
-    # now, draw a whitespace glyph and the notedef glyphs. this process 
-    # won't track these or empty bitmaps (it would be great to track notdefs
-    # but they gum up the rest of this process)
-    notdef_1 = draw_char(chr(0), typeface, size)
-    notdef_2 = draw_char(chr(0x10ffff), typeface, size)
-    whitespace = draw_char(chr(20), typeface, size)
-
-    # compile to a dataframe and do the glyph pruning
-    df = pd.DataFrame(enumerate(bitmaps), columns=['DEC', 'BITMAP'])
-    df = df[(df['BITMAP'] != notdef_1) & (df['BITMAP'] != notdef_2)]
-    df = df[(df['BITMAP'] != whitespace) & (df['BITMAP'] != b'')]
-
-    # oddly, the glyphs themselves aren't important, they just mark a pairing, 
-    # so generate a remapping dictionary of the glyph: index position and 
-    # then remove the glyphs for a speedup
-    remap = {bitmap: idx for idx, bitmap in enumerate(df['BITMAP'].unique())}
-    df = df.replace(remap)
-
-    # group the unicode decimals by matching bitmaps
-    print("+ Grouping characters")
-    char_groups = (
-        df
-        .groupby('BITMAP')['DEC']
-        .apply(list)
-        .to_frame()
+    setting = (size, mode)
+    tables = find_glyphs_multi(
+        typeface,
+        [setting],
+        n_cores,
+        full_scan,
+        chunksize,
+        outline_pass,
+        cache
     )
+    return tables[setting]
 
-    # explode the list of decimals into new rows, then reset the index
-    char_groups = (
-        char_groups
-        .explode('DEC')
-        .reset_index()
-    )
-    return char_groups
+def find_glyphs_multi(typeface, settings, n_cores=4, full_scan=False, chunksize=2048, outline_pass=True, cache=None):
+    """generate glyphs for a font under several settings in a single pass.
 
-def make_coocc_table(char_groups):
-    """find all character co-occurrences for a font.
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :param n_cores: cores to use in multiprocessing
+    :type n_cores: int
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points sent to a worker at a time
+    :type chunksize: int
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param cache: bitmap digests from earlier runs
+    :type cache: RenderCache
+    :returns: (size, mode)--table of glyph--unicode decimal pairs
+    :rtype: dict
+    """
+    # compile draw_chunk() as a partial function and stream chunks of every 
+    # code point the font maps (or every possible unicode code point, if asked 
+    # to) through the pool. each worker loads the font once, up front
+    settings = [tuple(setting) for setting in settings]
+    codepoints, members = get_render_set(typeface, full_scan, outline_pass)
+    to_pool = partial(draw_chunk, typeface=typeface, settings=settings)
+
+    skips = [skip_keys(typeface, size, mode) for size, mode in settings]
+
+    # group the unicode decimals by bitmap digest as the results stream in, 
+    # starting with any that were cached in an earlier run
+    groups = [{} for _ in settings]
+    if cache is not None:
+        fhash = font_hash(typeface)
+        cached, codepoints = cache.lookup(fhash, settings, codepoints)
+        print("+ Found", len(cached), "code point(s) in the cache")
+        collect_groups(cached, skips, groups, members)
+
+    with multiprocessing.Pool(n_cores, init_worker, (typeface, settings)) as pool:
+        print("+ Generating bitmaps for", len(codepoints), "code point(s)")
+        chunks = chunk_codepoints(codepoints, chunksize)
+        for rendered in pool.imap_unordered(to_pool, chunks):
+            collect_groups(rendered, skips, groups, members)
+            if cache is not None:
+                cache.add(fhash, settings, rendered)
+
+    if cache is not None:
+        cache.evict()
+
+    print("+ Grouping characters")
+    return {
+        setting: group_table(grouped.values())
+        for setting, grouped in zip(settings, groups)
+    }
+
+def find_near_glyphs(typeface, size=10, similarity=0.95, n_cores=4, full_scan=False, chunksize=2048, mode='L', outline_pass=True, grid=16):
+    """group the characters in a font by near-identical glyphs.
+
+    characters are first grouped by exact bitmap, as in find_glyphs(). each 
+    distinct bitmap then gets a perceptual signature, and bitmaps whose 
+    signatures are at least `similarity` alike are merged through an lsh index
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param size: size to draw
+    :type size: int
+    :param similarity: share of signature bits two glyphs must have in common
+    :type similarity: float
+    :param n_cores: cores to use in multiprocessing
+    :type n_cores: int
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points sent to a worker at a time
+    :type chunksize: int
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param grid: width and height of the signature thumbnail
+    :type grid: int
+    :returns: table of glyph--unicode decimal pairs
+    :rtype: pandas dataframe
+    """
+    codepoints, members = get_render_set(typeface, full_scan, outline_pass)
+    to_pool = partial(sign_chunk, typeface=typeface, size=size, mode=mode, grid=grid)
+    skips = [skip_keys(typeface, size, mode)]
+
+    groups = [{}]
+    sigs = {}
+    with multiprocessing.Pool(n_cores, init_worker, (typeface, [(size, mode)])) as pool:
+        print("+ Generating bitmaps for", len(codepoints), "code point(s)")
+        chunks = chunk_codepoints(codepoints, chunksize)
+        for signed in pool.imap_unordered(to_pool, chunks):
+            rendered = [(dec, (key,)) for dec, key, _ in signed]
+            collect_groups(rendered, skips, groups, members)
+            sigs.update((key, sig) for _, key, sig in signed)
+
+    print("+ Finding near-identical glyphs")
+    exact = list(groups[0].values())
+    keys = list(groups[0].keys())
+    merged = []
+    seen = set()
+    if keys:
+        matrix = np.vstack([sigs[key] for key in keys])
+        for near in near_groups(matrix, similarity):
+            merged.append([dec for idx in near for dec in exact[idx]])
+            seen.update(near.tolist())
+    merged.extend(group for idx, group in enumerate(exact) if idx not in seen)
+    return group_table(merged)
+
+def skip_keys(typeface, size, mode='L'):
+    """find the bitmap digests that shouldn't be grouped.
+
+    these are a whitespace glyph and the notdef glyphs. the grouping process 
+    won't track these or empty bitmaps (it would be great to track notdefs but 
+    they gum up the rest of this process)
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param size: size to draw
+    :type size: int
+    :param mode: antialiased ('L') or aliased ('1') rendering
+    :type mode: str
+    :returns: bitmap digests to skip
+    :rtype: set
+    """
+    return {
+        draw_char(chr(0), typeface, size, mode),
+        draw_char(chr(0x10ffff), typeface, size, mode),
+        draw_char(chr(20), typeface, size, mode)
+    }
+
+def collect_groups(rendered, skips, groups, members=None):
+    """add unicode decimals to the group of their bitmap digest per setting.
+
+    :param rendered: unicode decimal--bitmap digests pairs
+    :type rendered: iterable
+    :param skips: bitmap digests to leave out, one set per setting
+    :type skips: list
+    :param groups: bitmap digest--unicode decimals groups, one dict per 
+        setting, updated in place
+    :type groups: list
+    :param members: outline groups, if the outline pass was used
+    :type members: OutlineGroups
+    :returns: the updated groups
+    :rtype: list
+    """
+    for dec, keys in rendered:
+        decs = members[dec].tolist() if members is not None else [dec]
+        for key, skip, grouped in zip(keys, skips, groups):
+            width, height, _ = key
+            if key in skip or width * height == 0:
+                continue
+            grouped.setdefault(key, []).extend(decs)
+    return groups
+
+def group_table(groups):
+    """format groups of unicode decimals as a glyph--unicode decimal table.
+
+    oddly, the glyphs themselves aren't important, they just mark a pairing. 
+    glyphs are numbered in order of the first decimal that uses them
+
+    :param groups: unicode decimals that share a glyph
+    :type groups: iterable
+    :returns: table of glyph--unicode decimal pairs
+    :rtype: pandas dataframe
+    """
+    groups = sorted(sorted(group) for group in groups)
+    sizes = [len(group) for group in groups]
+    return pd.DataFrame({
+        'BITMAP': np.repeat(np.arange(len(groups)), sizes),
+        'DEC': [dec for group in groups for dec in group]
+    }, columns=['BITMAP', 'DEC'])
+
+def make_coocc_matrix(char_groups):
+    """find all character co-occurrences for a font as a sparse matrix.
 
     a co-occurrence marks characters represented by the same glyph
 
     :param char_groups: glyph--unicode pairs
     :type char_groups: pandas dataframe
-    :returns: character co-occurrence matrix
-    :rtype: pandas dataframe
+    :returns: unicode decimal labels and character co-occurrence matrix
+    :rtype: tup
     """
     if char_groups.empty:
-        return pd.DataFrame(index=['BITMAP'], columns=['DEC'])
+        return np.array([], dtype=np.int64), sparse.coo_matrix((0, 0), dtype=np.int64)
 
     print("+ Cross tabulating")
     tabulated = crosstab(
@@ -102,24 +461,417 @@ def make_coocc_table(char_groups):
 
     print("+ Generating co-occurrence matrix")
     coocc = tabulated[1].T.dot(tabulated[1])
+    return labels, coocc.tocoo()
+
+def make_coocc_table(char_groups):
+    """find all character co-occurrences for a font as a dense table.
+
+    :param char_groups: glyph--unicode pairs
+    :type char_groups: pandas dataframe
+    :returns: character co-occurrence matrix
+    :rtype: pandas dataframe
+    """
+    if char_groups.empty:
+        return pd.DataFrame(index=['BITMAP'], columns=['DEC'])
+
+    labels, coocc = make_coocc_matrix(char_groups)
     return pd.DataFrame(
         coocc.todense(),
         index=labels,
         columns=labels
     )
 
-def filter_files(indir, outdir):
+def write_atomic(path, write):
+    """write a file so that it only appears once it is complete.
+
+    the data goes to a hidden temporary file first, which then replaces the 
+    target in one step
+
+    :param path: filepath, where to write
+    :type path: str
+    :param write: function that writes to an open binary file
+    :type write: callable
+    """
+    dirname, basename = os.path.split(path)
+    tmp = os.path.join(dirname, "." + basename + ".tmp")
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+def write_output(outpath, char_groups, fmt='npz'):
+    """write the co-occurrences for a font.
+
+    :param outpath: filepath, where to write
+    :type outpath: str
+    :param char_groups: glyph--unicode pairs
+    :type char_groups: pandas dataframe
+    :param fmt: sparse co-occurrences (npz) or a dense table (csv)
+    :type fmt: str
+    """
+    if fmt == 'csv':
+        coocc = make_coocc_table(char_groups)
+        write_atomic(outpath, lambda f: coocc.to_csv(f))
+    else:
+        labels, coocc = make_coocc_matrix(char_groups)
+        write_atomic(outpath, lambda f: save_coocc(f, labels, coocc))
+
+def save_checkpoint(path, rendered, n_settings):
+    """save the bitmap digests of a finished chunk.
+
+    :param path: filepath, where to save the chunk
+    :type path: str
+    :param rendered: unicode decimal--bitmap digests pairs
+    :type rendered: list
+    :param n_settings: number of settings drawn for each code point
+    :type n_settings: int
+    """
+    decs = [dec for dec, _ in rendered]
+    dims = [[key[:2] for key in keys] for _, keys in rendered]
+    digests = [[key[2] for key in keys] for _, keys in rendered]
+    write_atomic(path, lambda f: np.savez(
+        f,
+        dec=np.array(decs, dtype=np.int64),
+        dims=np.array(dims, dtype=np.int32).reshape(-1, n_settings, 2),
+        digest=np.array(digests, dtype='S16').reshape(-1, n_settings)
+    ))
+
+def load_checkpoint(path):
+    """load the bitmap digests of a finished chunk.
+
+    :param path: filepath, a chunk saved with save_checkpoint()
+    :type path: str
+    :returns: unicode decimal--bitmap digests pairs
+    :rtype: list
+    """
+    with np.load(path) as npz:
+        # numpy strips trailing null bytes from fixed-width byte strings, so 
+        # pad the digests back out
+        return [
+            (dec, tuple(
+                (width, height, digest.ljust(16, b'\0'))
+                for (width, height), digest in zip(dims, digests)
+            ))
+            for dec, dims, digests
+            in zip(npz['dec'].tolist(), npz['dims'].tolist(), npz['digest'].tolist())
+        ]
+
+def setting_dir(outdir, setting, settings):
+    """find the output directory for a setting.
+
+    a single setting writes straight to the output directory. several settings 
+    each get a subdirectory, e.g. 10px or 12px_mono
+
+    :param outdir: path, directory to output results
+    :type outdir: str
+    :param setting: (size, mode) pair
+    :type setting: tup
+    :param settings: every (size, mode) pair being drawn
+    :type settings: list
+    :returns: path to the setting's output directory
+    :rtype: str
+    """
+    if len(settings) == 1:
+        return outdir
+    size, mode = setting
+    suffix = "_mono" if mode == '1' else ""
+    return os.path.join(outdir, f"{size}px{suffix}")
+
+def plan_font(name, typeface, outdir, settings, full_scan=False, chunksize=2048, outline_pass=True, cache=None):
+    """split a font into chunks and find the ones still to render.
+
+    chunks that finished in an earlier run are checkpointed in a hidden 
+    directory. if the settings, the font file, or the code points left to draw
+    have changed since then, start over. code points found in the render cache
+    aren't chunked at all, so what each chunk holds depends on the cache. their
+    bitmap digests are checkpointed too, rather than held until the font is
+    finalized
+
+    :param name: name of the font
+    :type name: str
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param outdir: path, directory to output results
+    :type outdir: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points per chunk
+    :type chunksize: int
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param cache: bitmap digests from earlier runs
+    :type cache: RenderCache
+    :returns: checkpoint directory, number of chunks, chunks to render, 
+        outline groups, and the font's hash
+    :rtype: dict
+    """
+    codepoints, members = get_render_set(typeface, full_scan, outline_pass)
+    cached, fhash = [], font_hash(typeface)
+    if cache is not None:
+        cached, codepoints = cache.lookup(fhash, settings, codepoints)
+    # chunks of an array are views of it, so they cost next to nothing to keep
+    if not isinstance(codepoints, range):
+        codepoints = np.asarray(codepoints, dtype=np.int64)
+    chunks = list(chunk_codepoints(codepoints, chunksize))
+    planned = hashlib.blake2b(np.asarray(codepoints, dtype='<u4').tobytes(), digest_size=16)
+    meta = {
+        'hash': fhash,
+        'settings': [list(setting) for setting in settings],
+        'full_scan': full_scan,
+        'outline_pass': outline_pass,
+        'chunksize': chunksize,
+        'n_chunks': len(chunks),
+        'codepoints': planned.hexdigest()
+    }
+
+    ckpt_dir = os.path.join(outdir, ".checkpoints", name)
+    meta_path = os.path.join(ckpt_dir, "settings.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            if json.load(f) != meta:
+                shutil.rmtree(ckpt_dir)
+    if not os.path.exists(meta_path):
+        os.makedirs(ckpt_dir, exist_ok=True)
+        encoded = json.dumps(meta).encode('utf-8')
+        write_atomic(meta_path, lambda f: f.write(encoded))
+    if cached:
+        save_checkpoint(os.path.join(ckpt_dir, "cached.npz"), cached, len(settings))
+
+    done = set(f for f in os.listdir(ckpt_dir) if f.endswith(".npz"))
+    todo = [
+        (idx, chunk) for idx, chunk in enumerate(chunks)
+        if f"{idx}.npz" not in done
+    ]
+    return {
+        'dir': ckpt_dir,
+        'n_chunks': len(chunks),
+        'todo': todo,
+        'members': members,
+        'hash': fhash
+    }
+
+def finalize_font(name, typeface, plan, outdir, settings, fmt='npz'):
+    """group the checkpointed chunks of a font and write its outputs.
+
+    :param name: name of the font
+    :type name: str
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param plan: the font's plan from plan_font()
+    :type plan: dict
+    :param outdir: path, directory to output results
+    :type outdir: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :param fmt: sparse co-occurrences (npz) or a dense table (csv)
+    :type fmt: str
+    """
+    skips = [skip_keys(typeface, size, mode) for size, mode in settings]
+    groups = [{} for _ in settings]
+    cached = os.path.join(plan['dir'], "cached.npz")
+    if os.path.exists(cached):
+        collect_groups(load_checkpoint(cached), skips, groups, plan['members'])
+    for idx in range(plan['n_chunks']):
+        path = os.path.join(plan['dir'], f"{idx}.npz")
+        collect_groups(load_checkpoint(path), skips, groups, plan['members'])
+
+    for setting, grouped in zip(settings, groups):
+        char_groups = group_table(grouped.values())
+        outpath = os.path.join(setting_dir(outdir, setting, settings), name + "." + fmt)
+        write_output(outpath, char_groups, fmt)
+    shutil.rmtree(plan['dir'])
+    print("Finished", name)
+
+def interleave(plans, width):
+    """order render tasks round-robin across fonts.
+
+    each font contributes one chunk per round, so small fonts finish early 
+    instead of waiting behind every chunk of a large one. fonts are taken from 
+    plans only as rounds have room for them, so a generator that plans fonts 
+    on demand never has more than `width` of them waiting to be drawn
+
+    :param plans: font name--typeface--plan triples
+    :type plans: iterable
+    :param width: most fonts in a round
+    :type width: int
+    :returns: render tasks
+    :rtype: generator
+    """
+    plans = iter(plans)
+    queues = []
+    while True:
+        while len(queues) < width:
+            planned = next(plans, None)
+            if planned is None:
+                break
+            name, typeface, plan = planned
+            queues.append((name, typeface, iter(plan['todo'])))
+        if not queues:
+            return
+        remaining = []
+        for name, typeface, todo in queues:
+            task = next(todo, None)
+            if task is not None:
+                yield name, typeface, task
+                remaining.append((name, typeface, todo))
+        queues = remaining
+
+def plan_fonts(fonts, outdir, settings, plans, failed, full_scan=False, chunksize=2048, fmt='npz', outline_pass=True, cache=None):
+    """plan fonts one at a time, as their chunks are needed.
+
+    a font that can't be planned is reported and skipped. a font whose chunks 
+    were all checkpointed in an earlier run is finalized straight away
+
+    :param fonts: font name--filepath pairs
+    :type fonts: list
+    :param outdir: path, directory to output results
+    :type outdir: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :param plans: font name--(typeface, plan, chunks left) of planned fonts 
+        still drawing, updated in place
+    :type plans: dict
+    :param failed: names of fonts that failed, updated in place
+    :type failed: set
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points per chunk
+    :type chunksize: int
+    :param fmt: sparse co-occurrences (npz) or a dense table (csv)
+    :type fmt: str
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param cache: bitmap digests from earlier runs
+    :type cache: RenderCache
+    :returns: font name--typeface--plan triples for fonts with chunks to draw
+    :rtype: generator
+    """
+    for name, typeface in fonts:
+        try:
+            plan = plan_font(name, typeface, outdir, settings, full_scan, chunksize, outline_pass, cache)
+            if not plan['todo']:
+                finalize_font(name, typeface, plan, outdir, settings, fmt)
+                continue
+        except Exception as error:
+            print("Failed", name + ":", repr(error))
+            failed.add(name)
+            continue
+        plans[name] = [typeface, plan, len(plan['todo'])]
+        yield name, typeface, plan
+
+def run_corpus(fonts, outdir, settings, n_cores=4, full_scan=False, chunksize=2048, fmt='npz', outline_pass=True, cache=None):
+    """render a corpus of fonts in one pool, checkpointing every chunk.
+
+    work is split into (font, chunk) tasks. finished chunks are written to 
+    disk as they arrive, so a rerun picks up from the last finished chunk; a 
+    font's output is written once all of its chunks are done. every chunk is 
+    drawn under every setting at once. with a render cache, only code points 
+    missing from it are drawn, and new renders are added to it
+
+    fonts are planned as the pool needs more work, and only a few chunks are 
+    queued at a time, so only a bounded number of plans is ever held however 
+    large the corpus. a font that fails to plan, draw, or finalize is reported 
+    and left for a rerun; the rest carry on
+
+    :param fonts: font name--filepath pairs
+    :type fonts: list
+    :param outdir: path, directory to output results
+    :type outdir: str
+    :param settings: (size, mode) pairs to draw
+    :type settings: list
+    :param n_cores: cores to use in multiprocessing
+    :type n_cores: int
+    :param full_scan: render every unicode code point, not just mapped ones
+    :type full_scan: bool
+    :param chunksize: number of code points per chunk
+    :type chunksize: int
+    :param fmt: sparse co-occurrences (npz) or a dense table (csv)
+    :type fmt: str
+    :param outline_pass: group code points by outline before drawing
+    :type outline_pass: bool
+    :param cache: bitmap digests from earlier runs
+    :type cache: RenderCache
+    :returns: names of the fonts that failed
+    :rtype: set
+    """
+    settings = [tuple(setting) for setting in settings]
+    for setting in settings:
+        os.makedirs(setting_dir(outdir, setting, settings), exist_ok=True)
+    print("+ Rendering", len(fonts), "font(s)")
+
+    plans, failed = {}, set()
+    planned = plan_fonts(fonts, outdir, settings, plans, failed, full_scan, chunksize, fmt, outline_pass, cache)
+    tasks = interleave(planned, n_cores)
+    # the pool would drain a task generator as fast as it could, planning every 
+    # font up front, so chunks are handed over a few at a time instead
+    results = queue.SimpleQueue()
+    with multiprocessing.Pool(n_cores) as pool:
+        def submit():
+            for name, typeface, (idx, codepoints) in tasks:
+                if name in plans:
+                    task = (name, typeface, settings, idx, codepoints)
+                    pool.apply_async(
+                        draw_task,
+                        (task,),
+                        callback=results.put,
+                        error_callback=lambda error, name=name, idx=idx: results.put((name, idx, None, repr(error)))
+                    )
+                    return 1
+            return 0
+
+        in_flight = sum(submit() for _ in range(2 * n_cores))
+        count = 0
+        while in_flight:
+            name, idx, rendered, error = results.get()
+            in_flight -= 1
+            count += 1
+            if name in plans:
+                typeface, plan, _ = plans[name]
+                try:
+                    if error is not None:
+                        raise RuntimeError(f"chunk {idx}: {error}")
+                    save_checkpoint(os.path.join(plan['dir'], f"{idx}.npz"), rendered, len(settings))
+                    if cache is not None:
+                        cache.add(plan['hash'], settings, rendered)
+                    plans[name][2] -= 1
+                    if plans[name][2] == 0:
+                        del plans[name]
+                        finalize_font(name, typeface, plan, outdir, settings, fmt)
+                except Exception as error:
+                    print("Failed", name + ":", repr(error))
+                    plans.pop(name, None)
+                    failed.add(name)
+            if count % 100 == 0:
+                print(f"+ Rendered {count} chunk(s)")
+            in_flight += submit()
+
+    if cache is not None:
+        cache.evict()
+    return failed
+
+def filter_files(indir, outdirs):
     """identify files to render.
 
+    outputs are written atomically, so any output present is complete. a font 
+    is only done once every output directory has it
+
     :param indir: path, directory of .ttf files
     :type indir: str
-    :param outdir: path, directory to output results
-    :type outdir: str
+    :param outdirs: path(s), directory or directories to output results
+    :type outdirs: str or list
     :returns: files to render
     :rtype: list
     """
+    if isinstance(outdirs, str):
+        outdirs = [outdirs]
     infiles = [f for f in os.listdir(indir) if f.startswith('.') is False]
-    outfiles = [f[:-4] for f in os.listdir(outdir) if f.startswith('.') is False]
+    outfiles = None
+    for outdir in outdirs:
+        found = set()
+        if os.path.isdir(outdir):
+            found = set(f[:-4] for f in os.listdir(outdir) if f.startswith('.') is False)
+        outfiles = found if outfiles is None else outfiles & found
     to_run = [f for f in infiles if f[:-4] not in outfiles]
 
     print(len(outfiles), "font(s) already generated. Generating", len(to_run), "font(s)")
@@ -131,16 +883,49 @@ def main(args):
     :param args: command line arguments
     :type args: namespace args
     """
-    to_run = filter_files(args.indir, args.outdir)
+    settings = [(size, mode) for size in args.size for mode in args.mode]
+    outdirs = [setting_dir(args.outdir, setting, settings) for setting in settings]
+    to_run = filter_files(args.indir, outdirs)
+    fonts = [(f[:-4], os.path.join(args.indir, f)) for f in to_run]
+    cache = None
+    if args.cache_dir is not None:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 ** 2)
 
-    for f in to_run:
-        name = f[:-4]
-        print("Generating glyphs for", name)
-        inpath = os.path.join(args.indir, f)
-        char_groups = find_glyphs(inpath, size=args.size, n_cores=args.n_cores)
-        coocc = make_coocc_table(char_groups)
-        outpath = os.path.join(args.outdir, name + ".csv")
-        coocc.to_csv(outpath)
+    # near-homoglyphs are found one font at a time, without checkpoints
+    if args.fuzzy is not None:
+        for name, typeface in fonts:
+            print("Finding near-homoglyphs for", name)
+            for setting in settings:
+                size, mode = setting
+                char_groups = find_near_glyphs(
+                    typeface,
+                    size=size,
+                    similarity=args.fuzzy,
+                    n_cores=args.n_cores,
+                    full_scan=args.full_scan,
+                    chunksize=args.chunksize,
+                    mode=mode,
+                    outline_pass=not args.no_outline_pass
+                )
+                outdir = setting_dir(args.outdir, setting, settings)
+                os.makedirs(outdir, exist_ok=True)
+                outpath = os.path.join(outdir, name + "." + args.format)
+                write_output(outpath, char_groups, args.format)
+        return
+
+    failed = run_corpus(
+        fonts,
+        args.outdir,
+        settings,
+        n_cores=args.n_cores,
+        full_scan=args.full_scan,
+        chunksize=args.chunksize,
+        fmt=args.format,
+        outline_pass=not args.no_outline_pass,
+        cache=cache
+    )
+    if failed:
+        print(len(failed), "font(s) failed. Rerun to try them again")
 
 if __name__ == '__main__':
     parser = ArgumentParser()
@@ -158,7 +943,56 @@ if __name__ == '__main__':
     )
     parser.add_argument(
         '--size',
-        type=int
+        type=int,
+        nargs='+',
+        help="one or more sizes to draw"
+    )
+    parser.add_argument(
+        '--mode',
+        type=str,
+        nargs='+',
+        choices=['L', '1'],
+        default=['L'],
+        help="antialiased (L) and/or aliased (1) rendering"
+    )
+    parser.add_argument(
+        '--full_scan',
+        action='store_true',
+        help="render every unicode code point instead of the font's cmap"
+    )
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=['npz', 'csv'],
+        default='npz',
+        help="sparse co-occurrences (npz) or a dense co-occurrence table (csv)"
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=2048,
+        help="code points per checkpointed chunk"
+    )
+    parser.add_argument(
+        '--no_outline_pass',
+        action='store_true',
+        help="draw every code point instead of one per identical outline"
+    )
+    parser.add_argument(
+        '--fuzzy',
+        type=float,
+        help="group near-identical glyphs at this similarity (0-1)"
+    )
+    parser.add_argument(
+        '--cache_dir',
+        type=str,
+        help="directory to cache bitmap digests in between runs"
+    )
+    parser.add_argument(
+        '--cache_size',
+        type=int,
+        default=1024,
+        help="size in MB the render cache is trimmed back to"
     )
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import zlib
+import struct
+import hashlib
+import PIL
+from PIL import features
+
+# one cached render: unicode decimal, bitmap width and height, bitmap digest,
+# and a checksum of the rest of the record
+RECORD = struct.Struct('<IHH16sI')
+# bump when the record layout changes, so that old segments aren't misread
+FORMAT = 2
+
+def pack_record(dec, width, height, digest):
+    """pack one render into a cache record.
+
+    :param dec: unicode decimal
+    :type dec: int
+    :param width: bitmap width
+    :type width: int
+    :param height: bitmap height
+    :type height: int
+    :param digest: bitmap digest
+    :type digest: bytes
+    :returns: the record
+    :rtype: bytes
+    """
+    body = RECORD.pack(dec, width, height, digest, 0)[:-4]
+    return body + struct.pack('<I', zlib.crc32(body))
+
+def font_hash(path):
+    """hash the contents of a font file.
+
+    renamed or moved copies of a font hash the same
+
+    :param path: filepath, a font file
+    :type path: str
+    :returns: hex digest of the file's contents
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def engine_tag():
+    """identify the rendering engine, so that upgrades don't reuse old renders.
+
+    :returns: short hash of the pillow and freetype versions and raqm support
+    :rtype: str
+    """
+    engine = f"{PIL.__version__}/{features.version('freetype2')}/{features.check('raqm')}"
+    return hashlib.blake2b(engine.encode('utf-8'), digest_size=4).hexdigest()
+
+class RenderCache:
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        """initialize a content-addressed cache of bitmap digests.
+
+        renders are stored per font (by content hash) and per (size, mode)
+        setting, in append-only files of fixed-width records
+
+        :param cache_dir: path, directory to keep the cache in
+        :type cache_dir: str
+        :param max_bytes: size the cache is trimmed back to
+        :type max_bytes: int
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.engine = engine_tag()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _segment(self, fhash, setting):
+        """find the file holding the renders of a font under one setting.
+
+        :param fhash: hex digest of a font file
+        :type fhash: str
+        :param setting: (size, mode) pair
+        :type setting: tup
+        :returns: path to the segment
+        :rtype: str
+        """
+        size, mode = setting
+        name = f"{fhash}_{size}_{mode}_{self.engine}_v{FORMAT}.bin"
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, fhash, setting):
+        """load every cached render of a font under one setting.
+
+        a record cut short by a crash, or whose checksum doesn't match, is
+        ignored
+
+        :param fhash: hex digest of a font file
+        :type fhash: str
+        :param setting: (size, mode) pair
+        :type setting: tup
+        :returns: unicode decimal--(width, height, digest) pairs
+        :rtype: dict
+        """
+        path = self._segment(fhash, setting)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mark the segment as recently used
+        os.utime(path)
+        usable = len(data) - len(data) % RECORD.size
+        renders = {}
+        for start in range(0, usable, RECORD.size):
+            record = data[start:start + RECORD.size]
+            dec, width, height, digest, check = RECORD.unpack(record)
+            if zlib.crc32(record[:-4]) == check:
+                renders[dec] = (width, height, digest)
+        return renders
+
+    def lookup(self, fhash, settings, codepoints):
+        """split code points into those cached under every setting and the rest.
+
+        :param fhash: hex digest of a font file
+        :type fhash: str
+        :param settings: (size, mode) pairs
+        :type settings: list
+        :param codepoints: unicode decimals to look up
+        :type codepoints: range or list
+        :returns: cached unicode decimal--bitmap digests pairs and the unicode
+            decimals still to draw
+        :rtype: tup
+        """
+        segments = [self.load(fhash, setting) for setting in settings]
+        hits, misses = [], []
+        for dec in codepoints:
+            keys = tuple(segment.get(dec) for segment in segments)
+            if None in keys:
+                misses.append(dec)
+            else:
+                hits.append((dec, keys))
+        return hits, misses
+
+    def add(self, fhash, settings, rendered):
+        """append new renders to the cache.
+
+        a record left cut short by a crash is cut off first, so that new
+        records line up with the old ones
+
+        :param fhash: hex digest of a font file
+        :type fhash: str
+        :param settings: (size, mode) pairs
+        :type settings: list
+        :param rendered: unicode decimal--bitmap digests pairs, one digest per
+            setting
+        :type rendered: list
+        """
+        for idx, setting in enumerate(settings):
+            records = b''.join(
+                pack_record(dec, *keys[idx]) for dec, keys in rendered
+            )
+            with open(self._segment(fhash, setting), 'ab') as f:
+                size = f.tell()
+                if size % RECORD.size:
+                    f.truncate(size - size % RECORD.size)
+                f.write(records)
+
+    def evict(self):
+        """delete the least recently used segments until the cache fits.
+
+        :returns: number of segments deleted
+        :rtype: int
+        """
+        segments = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".bin"):
+                stat = os.stat(path)
+                segments.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in segments)
+        deleted = 0
+        for _, size, path in sorted(segments):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            deleted += 1
+        return deleted
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from PIL import Image
+
+# number of set bits in every possible byte
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def signature(bitmap, grid=16):
+    """make a compact perceptual signature for a glyph bitmap.
+
+    the bitmap is centered on a square canvas (so glyphs keep their aspect
+    ratio), shrunk to a grid x grid thumbnail, and thresholded to one bit per
+    cell at half the thumbnail's own peak, so thin strokes that average out
+    below mid-grey still leave a mark. bitmaps smaller than the grid aren't
+    scaled up, so small marks stay small. glyphs that differ by a few pixels
+    get signatures that differ by a few bits. a bitmap with no ink at all
+    gets an all-zero signature
+
+    :param bitmap: a glyph bitmap, e.g. from Glyph.bitmap(..., 'numpy')
+    :type bitmap: numpy array
+    :param grid: width and height of the thumbnail
+    :type grid: int
+    :returns: a bit-packed signature of grid * grid bits, or None for an
+        empty bitmap
+    :rtype: numpy array or None
+    """
+    height, width = bitmap.shape
+    if height * width == 0:
+        return None
+
+    side = max(height, width, grid)
+    canvas = np.zeros((side, side), dtype=np.uint8)
+    top, left = (side - height) // 2, (side - width) // 2
+    canvas[top:top + height, left:left + width] = bitmap
+
+    thumb = np.asarray(Image.fromarray(canvas).resize((grid, grid), Image.BOX))
+    return np.packbits(thumb >= max((int(thumb.max()) + 1) // 2, 1))
+
+def hamming(a, b):
+    """count the bits that differ between bit-packed signatures.
+
+    :param a: signatures, one per row
+    :type a: numpy array
+    :param b: signatures, one per row
+    :type b: numpy array
+    :returns: hamming distances
+    :rtype: numpy array
+    """
+    return POPCOUNT[np.bitwise_xor(a, b)].sum(axis=-1, dtype=np.int64)
+
+class LSHIndex:
+
+    def __init__(self, n_bits, n_tables=8, bits_per_table=24, window=8, seed=0):
+        """initialize a bit-sampling locality-sensitive hash index.
+
+        each table keys a signature by a random sample of its bits, so close
+        signatures are likely to land in the same bucket of at least one table
+
+        :param n_bits: number of bits in a signature
+        :type n_bits: int
+        :param n_tables: number of hash tables
+        :type n_tables: int
+        :param bits_per_table: number of bits sampled by each table
+        :type bits_per_table: int
+        :param window: how many bucket neighbours each signature is compared to
+        :type window: int
+        :param seed: random seed for the bit samples
+        :type seed: int
+        """
+        if bits_per_table > 64:
+            raise ValueError("Use 64 or fewer bits per table")
+        rng = np.random.default_rng(seed)
+        self.n_bits = n_bits
+        self.window = window
+        self.samples = [
+            rng.choice(n_bits, size=min(bits_per_table, n_bits), replace=False)
+            for _ in range(n_tables)
+        ]
+
+    def _bucket_keys(self, sigs, sample):
+        """hash every signature into one table's buckets.
+
+        :param sigs: bit-packed signatures, one per row
+        :type sigs: numpy array
+        :param sample: bit positions the table uses
+        :type sample: numpy array
+        :returns: bucket keys
+        :rtype: numpy array
+        """
+        keys = np.zeros(len(sigs), dtype=np.uint64)
+        for shift, pos in enumerate(sample):
+            bit = (sigs[:, pos // 8] >> (7 - pos % 8)) & 1
+            keys |= bit.astype(np.uint64) << np.uint64(shift)
+        return keys
+
+    def candidate_pairs(self, sigs):
+        """find pairs of signatures that share a bucket.
+
+        within a bucket, signatures are sorted and each one is compared to the
+        next few, which keeps the work near-linear even for crowded buckets. 
+        pairs come in batches, one per table and neighbour offset, so callers 
+        can filter them without holding every candidate at once
+
+        :param sigs: bit-packed signatures, one per row
+        :type sigs: numpy array
+        :returns: batches of row indices of candidate pairs
+        :rtype: generator
+        """
+        # order rows by signature so that near neighbours sit side by side in
+        # every bucket
+        rows = np.ascontiguousarray(sigs).view(f"S{sigs.shape[1]}").ravel()
+        order = np.argsort(rows, kind='stable')
+
+        for sample in self.samples:
+            keys = self._bucket_keys(sigs, sample)[order]
+            by_key = order[np.argsort(keys, kind='stable')]
+            keys = np.sort(keys, kind='stable')
+            for offset in range(1, self.window + 1):
+                same = keys[:-offset] == keys[offset:]
+                yield by_key[:-offset][same], by_key[offset:][same]
+
+def ink(sigs):
+    """count the set bits in bit-packed signatures.
+
+    :param sigs: signatures, one per row
+    :type sigs: numpy array
+    :returns: set bits per signature
+    :rtype: numpy array
+    """
+    return POPCOUNT[sigs].sum(axis=-1, dtype=np.int64)
+
+def similarity_of(a, b, ink_a=None, ink_b=None):
+    """score how alike bit-packed signatures are.
+
+    the score is one minus the differing bits over the set bits of both
+    signatures, so a pixel of difference counts for more in a small mark than
+    in a large letter. signatures without ink have nothing to compare and
+    score 0
+
+    :param a: signatures, one per row
+    :type a: numpy array
+    :param b: signatures, one per row
+    :type b: numpy array
+    :param ink_a: precomputed set bits of a
+    :type ink_a: numpy array
+    :param ink_b: precomputed set bits of b
+    :type ink_b: numpy array
+    :returns: similarities between 0 and 1
+    :rtype: numpy array
+    """
+    ink_a = ink(a) if ink_a is None else ink_a
+    ink_b = ink(b) if ink_b is None else ink_b
+    total = ink_a + ink_b
+    scores = 1 - hamming(a, b) / np.maximum(total, 1)
+    return np.where((ink_a > 0) & (ink_b > 0), scores, 0.0)
+
+def near_groups(sigs, similarity=0.95, min_ink=8, **kwargs):
+    """group signatures whose similarity meets a threshold.
+
+    candidate pairs come from an lsh index and are kept if their similarity
+    is high enough. groups are then built by complete linkage: pairs are
+    taken from most to least similar, and two groups only merge if every
+    member of one is similar enough to every member of the other. groups
+    never chain through members that aren't alike. signatures with less ink
+    than min_ink are too small to tell shapes apart, and are left ungrouped
+
+    :param sigs: bit-packed signatures, one per row
+    :type sigs: numpy array
+    :param similarity: share of bits two signatures must have in common
+    :type similarity: float
+    :param min_ink: fewest set bits a signature needs to be grouped
+    :type min_ink: int
+    :param kwargs: options for the LSHIndex
+    :returns: row indices of every group with 2+ members
+    :rtype: list
+    """
+    counts = ink(sigs)
+    rows = np.flatnonzero(counts >= max(min_ink, 1))
+    if len(rows) < 2:
+        return []
+    index = LSHIndex(sigs.shape[1] * 8, **kwargs)
+    sigs, counts = sigs[rows], counts[rows]
+    left, right, kept = [], [], []
+    for batch_left, batch_right in index.candidate_pairs(sigs):
+        scores = similarity_of(
+            sigs[batch_left],
+            sigs[batch_right],
+            counts[batch_left],
+            counts[batch_right]
+        )
+        keep = scores >= similarity
+        left.append(batch_left[keep])
+        right.append(batch_right[keep])
+        kept.append(scores[keep])
+    left, right, kept = np.concatenate(left), np.concatenate(right), np.concatenate(kept)
+    order = np.argsort(-kept, kind='stable')
+
+    group_of = np.arange(len(sigs))
+    members = {}
+    for a, b in zip(left[order].tolist(), right[order].tolist()):
+        group_a, group_b = group_of[a], group_of[b]
+        if group_a == group_b:
+            continue
+        rows_a = members.get(group_a, [group_a])
+        rows_b = members.get(group_b, [group_b])
+        scores = similarity_of(
+            sigs[rows_a][:, None],
+            sigs[rows_b][None],
+            counts[rows_a][:, None],
+            counts[rows_b][None]
+        )
+        if scores.min() < similarity:
+            continue
+        # fold the smaller group into the larger
+        if len(rows_a) < len(rows_b):
+            group_a, group_b, rows_a, rows_b = group_b, group_a, rows_b, rows_a
+        group_of[rows_b] = group_a
+        members[group_a] = rows_a + rows_b
+        members.pop(group_b, None)
+    return [rows[sorted(group)] for _, group in sorted(members.items())]
@@ -5,6 +5,41 @@ from PIL import Image, ImageFont
 import base64
 import numpy as np
 
+def _load_font(typeface=None, size=10):
+    """load a font, unless it has already been loaded.
+
+    :param typeface: filepath, a typeface to use, or a loaded font
+    :type typeface: str or pil freetype font
+    :param size: the size to draw (ignored for loaded fonts)
+    :type size: int
+    :returns: the loaded font
+    :rtype: pil freetype font
+    """
+    if isinstance(typeface, ImageFont.FreeTypeFont):
+        return typeface
+    return ImageFont.truetype(typeface, size)
+
+def _mask_array(bitmap):
+    """view a bitmap as an array without drawing it again.
+
+    :param bitmap: a raw bitmap
+    :type bitmap: pil memory instance
+    :returns: the bitmap's pixels, one row per line
+    :rtype: numpy array
+    """
+    width, height = bitmap.size
+    return np.frombuffer(bytes(bitmap), dtype=np.uint8).reshape(height, width)
+
+def _stringify(pixels):
+    """write pixels as a string of 0s (blank) and 1s (inked).
+
+    :param pixels: pixel values
+    :type pixels: numpy array
+    :returns: the stringified pixels
+    :rtype: str
+    """
+    return ((pixels > 0) + ord('0')).astype(np.uint8).tobytes().decode('ascii')
+
 class Glyph:
 
     def __init__(self, char):
@@ -21,18 +56,23 @@ class Glyph:
         self.dec = ord(char)
         self.hex = hex(self.dec)
 
-    def _make_bitmap(self, typeface=None, size=10):
+    def _make_bitmap(self, typeface=None, size=10, mode='L'):
         """create a bitmap for the glyph.
 
-        :param typeface: filepath, a typeface to use
-        :type typeface: str
-        :param size: the size to draw
+        a font that has already been loaded may be passed in place of a filepath 
+        to avoid reopening the font file for every glyph
+
+        :param typeface: filepath, a typeface to use, or a loaded font
+        :type typeface: str or pil freetype font
+        :param size: the size to draw (ignored for loaded fonts)
         :type size: int
+        :param mode: antialiased ('L') or aliased ('1') rendering
+        :type mode: str
         :returns: a bitmap glyph for the character
         :rtype: pil memory instance
         """
-        font = ImageFont.truetype(typeface, size)
-        return font.getmask(self.char, mode='L')
+        font = _load_font(typeface, size)
+        return font.getmask(self.char, mode=mode)
 
     def dimensions(self, typeface=None, size=10):
         """return the dimensions of the glyph bitmap.
@@ -60,7 +100,7 @@ class Glyph:
         bitmap = self._make_bitmap(typeface, size)
         return Image.frombytes(bitmap.mode, bitmap.size, bytes(bitmap))
 
-    def bitmap(self, typeface=None, size=10, encode_as='b64'):
+    def bitmap(self, typeface=None, size=10, encode_as='b64', mode='L'):
         """return the glyph's bitmap.
 
         :param typeface: filepath, a typeface to use
@@ -69,6 +109,8 @@ class Glyph:
         :type size: int
         :param encode_as: an encoding method for the bitmap
         :type encode_as: str
+        :param mode: antialiased ('L') or aliased ('1') rendering
+        :type mode: str
         :returns: an encoded bitmap
         :rtype: byte str, numpy array, raw encoding, or str
         """
@@ -76,21 +118,129 @@ class Glyph:
         if encode_as not in VALID_OPTS:
             raise ValueError(f"{encode_as} is not valid. Use {', '.join(VALID_OPTS)}")
 
-        bitmap = self._make_bitmap(typeface, size)
+        bitmap = self._make_bitmap(typeface, size, mode)
         if encode_as == 'b64':
             bitmap = bytes(bitmap)
             return base64.b64encode(bitmap)
         if encode_as == 'bytes':
             return bytes(bitmap)
         if encode_as == 'numpy':
-            img = self.draw(typeface, size)
-            return np.asarray(img)
+            return _mask_array(bitmap)
         if encode_as == 'raw':
             return bitmap
         if encode_as == 'stringified':
-            img = self.draw(typeface, size)
-            arr = np.asarray(img)
-            grayscaled = (arr > 0).astype('uint8')
-            stringified = map(str, (bit for row in grayscaled for bit in row))
-            return ''.join(stringified)
+            return _stringify(_mask_array(bitmap).ravel())
 
+class GlyphBatch:
+
+    VALID_OPTS = ['b64', 'bytes', 'numpy', 'packed', 'stringified']
+
+    def __init__(self, chars):
+        """initialize a batch of characters to draw with one font.
+
+        :param chars: unicode characters
+        :type chars: iterable
+        """
+        chars = list(chars)
+        if any(len(char) != 1 for char in chars):
+            raise ValueError("Input single glyphs only!")
+        self.chars = chars
+        self.dec = np.array([ord(char) for char in chars], dtype=np.int64)
+        self.hex = [hex(dec) for dec in self.dec.tolist()]
+        self.bitmaps = None
+        self.sizes = None
+
+    def __len__(self):
+        return len(self.chars)
+
+    def render(self, typeface=None, size=10, mode='L'):
+        """draw every character in the batch.
+
+        bitmaps are padded with blank pixels to the largest width and height in 
+        the batch; each glyph's own width and height are kept alongside
+
+        :param typeface: filepath, a typeface to use, or a loaded font
+        :type typeface: str or pil freetype font
+        :param size: the size to draw (ignored for loaded fonts)
+        :type size: int
+        :param mode: antialiased ('L') or aliased ('1') rendering
+        :type mode: str
+        :returns: N x H x W bitmaps and N x 2 (width, height) sizes
+        :rtype: tup
+        """
+        font = _load_font(typeface, size)
+        masks = [font.getmask(char, mode=mode) for char in self.chars]
+        sizes = np.array([mask.size for mask in masks], dtype=np.int64).reshape(-1, 2)
+
+        width, height = sizes.max(axis=0, initial=0)
+        bitmaps = np.zeros((len(masks), height, width), dtype=np.uint8)
+        for idx, mask in enumerate(masks):
+            glyph_width, glyph_height = mask.size
+            bitmaps[idx, :glyph_height, :glyph_width] = _mask_array(mask)
+
+        self.bitmaps, self.sizes = bitmaps, sizes
+        return bitmaps, sizes
+
+    def _unpadded(self):
+        """gather every glyph's pixels, without padding, into one buffer.
+
+        :returns: the pixels of each glyph in turn and the offset where each 
+            glyph ends
+        :rtype: tup
+        """
+        _, height, width = self.bitmaps.shape
+        in_glyph = (
+            (np.arange(height)[None, :, None] < self.sizes[:, 1, None, None])
+            & (np.arange(width)[None, None, :] < self.sizes[:, 0, None, None])
+        )
+        ends = np.cumsum(self.sizes.prod(axis=1))
+        return self.bitmaps[in_glyph], ends
+
+    def _split(self, buffer, ends):
+        """split a buffer into one piece per glyph.
+
+        :param buffer: the pieces of each glyph in turn
+        :type buffer: bytes or str
+        :param ends: offset where each glyph ends
+        :type ends: numpy array
+        :returns: one piece per glyph
+        :rtype: list
+        """
+        starts = np.concatenate([[0], ends[:-1]])
+        return [buffer[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def bitmap(self, typeface=None, size=10, encode_as='numpy', mode='L'):
+        """return the bitmaps of every glyph in the batch.
+
+        'numpy' and 'packed' return one padded array for the whole batch (see 
+        self.sizes for each glyph's own dimensions). 'bytes', 'b64', and 
+        'stringified' return one unpadded encoding per glyph, matching 
+        Glyph.bitmap()
+
+        :param typeface: filepath, a typeface to use, or a loaded font
+        :type typeface: str or pil freetype font
+        :param size: the size to draw (ignored for loaded fonts)
+        :type size: int
+        :param encode_as: an encoding method for the bitmaps
+        :type encode_as: str
+        :param mode: antialiased ('L') or aliased ('1') rendering
+        :type mode: str
+        :returns: encoded bitmaps
+        :rtype: numpy array or list
+        """
+        if encode_as not in self.VALID_OPTS:
+            raise ValueError(f"{encode_as} is not valid. Use {', '.join(self.VALID_OPTS)}")
+
+        bitmaps, _ = self.render(typeface, size, mode)
+        if encode_as == 'numpy':
+            return bitmaps
+        if encode_as == 'packed':
+            return np.packbits(bitmaps > 0, axis=-1)
+
+        pixels, ends = self._unpadded()
+        if encode_as == 'stringified':
+            return self._split(_stringify(pixels), ends)
+        encoded = self._split(pixels.tobytes(), ends)
+        if encode_as == 'b64':
+            return [base64.b64encode(bitmap) for bitmap in encoded]
+        return encoded
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+from homoglypher.cache import font_hash
+
+class Manifest:
+
+    def __init__(self, path):
+        """initialize a record of which fonts went into a corpus, and how.
+
+        each font is tracked by its content hash, along with the settings it
+        was rendered with and whatever it contributed to the corpus metadata
+
+        :param path: filepath, where the manifest is kept (.json)
+        :type path: str
+        """
+        self.path = path
+        self.settings = None
+        self.fonts = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.settings = data['settings']
+            self.fonts = data['fonts']
+
+    def save(self, path=None):
+        """write the manifest, replacing the old one in one step.
+
+        :param path: filepath, where to write it instead of its own path (e.g.
+            a file to be moved into place later)
+        :type path: str
+        """
+        path = self.path if path is None else path
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'settings': self.settings, 'fonts': self.fonts}, f)
+        os.replace(tmp, path)
+
+    def fingerprint(self, name, path):
+        """find the content hash, size, and modification time of a font file.
+
+        files whose size and modification time haven't changed since they were
+        recorded aren't read again
+
+        :param name: name of the font
+        :type name: str
+        :param path: filepath, the font file
+        :type path: str
+        :returns: content hash, size in bytes, and modification time
+        :rtype: tup
+        """
+        stat = os.stat(path)
+        entry = self.fonts.get(name)
+        if entry and entry['bytes'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return entry['hash'], stat.st_size, stat.st_mtime_ns
+        return font_hash(path), stat.st_size, stat.st_mtime_ns
+
+    def diff(self, fonts, settings):
+        """compare a set of fonts to the manifest.
+
+        if the settings have changed, every font counts as changed
+
+        :param fonts: font name--filepath pairs
+        :type fonts: dict
+        :param settings: render settings
+        :type settings: dict
+        :returns: fonts to add, fonts to update, and fonts to remove, plus the
+            fingerprints of every font given
+        :rtype: tup
+        """
+        fingerprints = {name: self.fingerprint(name, path) for name, path in fonts.items()}
+        same_settings = settings == self.settings
+        added = sorted(name for name in fonts if name not in self.fonts)
+        changed = sorted(
+            name for name in fonts
+            if name in self.fonts and (
+                not same_settings or fingerprints[name][0] != self.fonts[name]['hash']
+            )
+        )
+        removed = sorted(name for name in self.fonts if name not in fonts)
+        return added, changed, removed, fingerprints
+
+    def add(self, name, filename, fingerprint, record):
+        """record a font's contribution to the corpus.
+
+        :param name: name of the font
+        :type name: str
+        :param filename: the font's file name
+        :type filename: str
+        :param fingerprint: content hash, size, and modification time
+        :type fingerprint: tup
+        :param record: the font's metadata row
+        :type record: dict
+        """
+        fhash, n_bytes, mtime = fingerprint
+        self.fonts[name] = {
+            'file': filename,
+            'hash': fhash,
+            'bytes': n_bytes,
+            'mtime': mtime,
+            'record': record
+        }
+
+    def remove(self, name):
+        """forget a font.
+
+        :param name: name of the font
+        :type name: str
+        """
+        self.fonts.pop(name, None)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections.abc import Sequence
+from fontTools.ttLib import TTFont
+from fontTools.pens.basePen import BasePen
+import multiprocessing
+from functools import partial
+import os
+import numpy as np
+from homoglypher import ttx
+from homoglypher.ttx import Component
+
+class _PointsPen(BasePen):
+
+    def __init__(self, glyphset):
+        """initialize a pen that records outline points.
+
+        :param glyphset: glyphs the outline may refer to
+        :type glyphset: dict-like
+        """
+        super().__init__(glyphset)
+        self.coords, self.flags, self.end_pts = [], [], []
+
+    def _point(self, pt, on):
+        self.coords.append(pt)
+        self.flags.append(on)
+
+    def _moveTo(self, pt):
+        self._point(pt, True)
+
+    def _lineTo(self, pt):
+        self._point(pt, True)
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        self._point(pt1, False)
+        self._point(pt2, False)
+        self._point(pt3, True)
+
+    def _qCurveToOne(self, pt1, pt2):
+        self._point(pt1, False)
+        self._point(pt2, True)
+
+    def _closePath(self):
+        self.end_pts.append(len(self.coords) - 1)
+
+    def _endPath(self):
+        self.end_pts.append(len(self.coords) - 1)
+
+def _decode_glyf(name, glyph):
+    """decode a truetype glyph.
+
+    :param name: name of the glyph
+    :type name: str
+    :param glyph: an expanded glyph from the glyf table
+    :type glyph: fonttools glyph
+    :returns: the decoded glyph
+    :rtype: ttx.Font.Char
+    """
+    if glyph.numberOfContours == 0:
+        return ttx.Font.Char(name)
+
+    bounds = (glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax)
+    if glyph.isComposite():
+        components = [
+            Component(component.glyphName, component.x, component.y, hex(component.flags))
+            for component in glyph.components
+        ]
+        return ttx.Font.Char(name, bounds, components=components)
+
+    return ttx.Font.Char(
+        name,
+        bounds,
+        np.array(glyph.coordinates, dtype=np.int32).reshape(-1, 2),
+        (np.frombuffer(bytes(glyph.flags), dtype=np.uint8) & 1).astype(bool),
+        np.array(glyph.endPtsOfContours, dtype=np.int32)
+    )
+
+def _decode_cff(name, charstring, charstrings):
+    """decode a cff glyph by drawing it.
+
+    cff outlines have no components, and their coordinates are rounded to
+    whole font units
+
+    :param name: name of the glyph
+    :type name: str
+    :param charstring: the glyph's charstring
+    :type charstring: fonttools t2 charstring
+    :param charstrings: every charstring in the font
+    :type charstrings: fonttools charstrings
+    :returns: the decoded glyph
+    :rtype: ttx.Font.Char
+    """
+    pen = _PointsPen(charstrings)
+    charstring.draw(pen)
+    if not pen.end_pts:
+        return ttx.Font.Char(name)
+
+    bounds = tuple(int(round(b)) for b in charstring.calcBounds(charstrings))
+    return ttx.Font.Char(
+        name,
+        bounds,
+        np.rint(np.array(pen.coords, dtype=float)).astype(np.int32).reshape(-1, 2),
+        np.array(pen.flags, dtype=bool),
+        np.array(pen.end_pts, dtype=np.int32)
+    )
+
+class _Glyphs(dict):
+
+    def __init__(self, decode):
+        """initialize a name--glyph index that decodes glyphs on first access.
+
+        :param decode: glyph name => decoded glyph
+        :type decode: callable
+        """
+        super().__init__()
+        self._decode = decode
+
+    def __missing__(self, name):
+        char = self[name] = self._decode(name)
+        return char
+
+class _Chars(Sequence):
+
+    def __init__(self, order, glyphs):
+        """initialize a view of the glyphs in glyph order.
+
+        :param order: glyph names in glyph order
+        :type order: list
+        :param glyphs: name--glyph index
+        :type glyphs: _Glyphs
+        """
+        self._order = order
+        self._glyphs = glyphs
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._glyphs[name] for name in self._order[idx]]
+        return self._glyphs[self._order[idx]]
+
+class Font(ttx.Font):
+
+    def __init__(self, filename, font_number=0):
+        """load a font straight from a .ttf/.otf/.ttc file.
+
+        the glyph order and cmap are read up front; each glyph is decoded the
+        first time it's used. the result has the same interface as a font
+        loaded from a .ttx dump
+
+        :param filename: filepath, a font file
+        :type filename: str
+        :param font_number: which font to read from a collection
+        :type font_number: int
+        """
+        self.font = TTFont(filename, lazy=True, fontNumber=font_number)
+        names = self.font.getGlyphOrder()
+        self.order = dict(enumerate(names))
+        self.order_rev = {name: idx for idx, name in enumerate(names)}
+
+        self.cmap = {}
+        if 'cmap' in self.font:
+            for table in self.font['cmap'].tables:
+                for code, name in table.cmap.items():
+                    self.cmap[name] = hex(code)
+        self.n_char = len(self.cmap)
+
+        self.glyphs = _Glyphs(self._decoder())
+        self.chars = _Chars(names, self.glyphs)
+        self._outlines = {}
+
+    def _decoder(self):
+        """pick the glyph decoder for the font's outline format.
+
+        :returns: glyph name => decoded glyph
+        :rtype: callable
+        """
+        if 'glyf' in self.font:
+            glyf = self.font['glyf']
+            return lambda name: _decode_glyf(name, glyf[name])
+        if 'CFF ' in self.font:
+            charstrings = self.font['CFF '].cff.topDictIndex[0].CharStrings
+            return lambda name: _decode_cff(name, charstrings[name], charstrings)
+        raise ValueError("Only glyf and CFF outlines are supported")
+
+    def close(self):
+        """close the font file."""
+        self.font.close()
+
+def _apply(path, func):
+    """load a font and run a function on it.
+
+    :param path: filepath, a font file
+    :type path: str
+    :param func: function to run on the font
+    :type func: callable
+    :returns: the font's file name and the function's result
+    :rtype: tup
+    """
+    font = Font(path)
+    try:
+        return os.path.basename(path), func(font)
+    finally:
+        font.close()
+
+def map_fonts(indir, func, n_cores=4):
+    """run a function on every font in a directory.
+
+    fonts are loaded and processed in a pool of workers. the function (which
+    must be importable, so that it can be sent to the workers) should return
+    something small, e.g. a summary of the font's glyphs
+
+    :param indir: path, directory of font files
+    :type indir: str
+    :param func: function to run on each font
+    :type func: callable
+    :param n_cores: cores to use in multiprocessing
+    :type n_cores: int
+    :returns: file name--result pairs
+    :rtype: dict
+    """
+    paths = [
+        os.path.join(indir, f) for f in sorted(os.listdir(indir))
+        if f.startswith('.') is False
+    ]
+    results = {}
+    with multiprocessing.Pool(n_cores) as pool:
+        to_pool = partial(_apply, func=func)
+        for count, (name, result) in enumerate(pool.imap_unordered(to_pool, paths), 1):
+            results[name] = result
+            if count % 100 == 0:
+                print(f"+ Processed {count} of {len(paths)} font(s)")
+    return results
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import numpy as np
+from fontTools.ttLib import TTFont
+
+def _outline_data(font):
+    """make a function that returns the raw outline data of a glyph.
+
+    truetype outlines are sliced straight out of the glyf table, so composite
+    glyphs compare by their component references. cff outlines use the
+    charstring bytecode and the font dict it's drawn with
+
+    :param font: a font to read
+    :type font: fonttools ttfont
+    :returns: glyph id, glyph name => outline bytes, or None if the font has
+        no outlines this can read
+    :rtype: callable or None
+    """
+    if 'glyf' in font and 'loca' in font:
+        raw = font.reader['glyf']
+        loca = font['loca']
+        return lambda gid, name: raw[loca[gid]:loca[gid + 1]]
+    if 'CFF ' in font:
+        charstrings = font['CFF '].cff.topDictIndex[0].CharStrings
+        def outline(gid, name):
+            charstring, selector = charstrings.getItemAndSelector(name)
+            if charstring.bytecode is None:
+                charstring.compile()
+            return bytes(charstring.bytecode) + str(selector).encode('ascii')
+        return outline
+    return None
+
+def glyph_keys(font):
+    """key each glyph by a hash of its outline and metrics.
+
+    two glyphs with the same key draw the same bitmap. glyphs whose outlines
+    can't be read are keyed by their names, so they only match themselves
+
+    :param font: a font to read
+    :type font: fonttools ttfont
+    :returns: glyph name--key pairs
+    :rtype: dict
+    """
+    order = font.getGlyphOrder()
+    outline = _outline_data(font)
+    if outline is None:
+        return {name: name for name in order}
+
+    metrics = font['hmtx'].metrics if 'hmtx' in font else {}
+    device = font['hdmx'].hdmx if 'hdmx' in font else {}
+    keys = {}
+    for gid, name in enumerate(order):
+        h = hashlib.blake2b(outline(gid, name), digest_size=16)
+        h.update(repr(metrics.get(name)).encode('ascii'))
+        h.update(repr([widths.get(name) for _, widths in sorted(device.items())]).encode('ascii'))
+        keys[name] = h.digest()
+    return keys
+
+class OutlineGroups:
+
+    def __init__(self, decs, offsets, notdef=None):
+        """initialize groups of code points held as flat arrays.
+
+        group i is decs[offsets[i]:offsets[i + 1]], and its first code point
+        is the one drawn for it. groups are in order of those code points
+
+        :param decs: unicode decimals, sorted by group
+        :type decs: numpy array
+        :param offsets: where each group starts in decs, plus the end of the last
+        :type offsets: numpy array
+        :param notdef: index of the group drawn with the notdef glyph, if any
+        :type notdef: int
+        """
+        self.decs = decs
+        self.offsets = offsets
+        self.reps = decs[offsets[:-1]]
+        self.notdef = notdef
+
+    def __len__(self):
+        return len(self.reps)
+
+    def __getitem__(self, rep):
+        """find the code points that share a drawn code point's outline.
+
+        :param rep: unicode decimal, a group's drawn code point
+        :type rep: int
+        :returns: unicode decimals in its group
+        :rtype: numpy array
+        """
+        idx = np.searchsorted(self.reps, rep)
+        return self.decs[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def without_notdef(self):
+        """leave out the group drawn with the notdef glyph.
+
+        :returns: the other groups
+        :rtype: OutlineGroups
+        """
+        if self.notdef is None:
+            return self
+        start, end = self.offsets[self.notdef], self.offsets[self.notdef + 1]
+        offsets = np.delete(self.offsets, self.notdef + 1)
+        offsets[self.notdef + 1:] -= end - start
+        return OutlineGroups(np.delete(self.decs, np.s_[start:end]), offsets)
+
+def outline_groups(typeface, codepoints, shaped=False):
+    """group code points whose glyphs are certain to draw the same bitmap.
+
+    code points share a group if the cmap sends them to the same glyph or to
+    glyphs with byte-identical outlines and metrics. only one code point per
+    group needs drawing. with text shaping (raqm), fonts with a GSUB table can
+    swap glyphs depending on the code point, so every code point is kept apart
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param codepoints: unicode decimals to group, in ascending order
+    :type codepoints: range or list
+    :param shaped: whether glyphs are drawn with text shaping
+    :type shaped: bool
+    :returns: the groups, or None if every code point is its own group
+    :rtype: OutlineGroups
+    """
+    font = TTFont(typeface, lazy=True, fontNumber=0)
+    if shaped and 'GSUB' in font:
+        font.close()
+        return None
+
+    cmap = font.getBestCmap() or {}
+    notdef = font.getGlyphOrder()[0]
+    keys = glyph_keys(font)
+    font.close()
+
+    # number the groups in order of their first code point, which is the one
+    # drawn for them
+    by_key = {}
+    ids = np.fromiter(
+        (by_key.setdefault(keys[cmap.get(dec, notdef)], len(by_key)) for dec in codepoints),
+        dtype=np.int64,
+        count=len(codepoints)
+    )
+    offsets = np.zeros(len(by_key) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=len(by_key)), out=offsets[1:])
+    decs = np.asarray(codepoints, dtype=np.int64)[np.argsort(ids, kind='stable')]
+    return OutlineGroups(decs, offsets, by_key.get(keys[notdef]))
@@ -4,9 +4,13 @@
 import os
 import json
 import string
-import unicodedata
+import multiprocessing
+from functools import partial
 import pandas as pd
 import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from homoglypher.unidata import lookup
 
 def get_style(name):
     """split the style from the base name of a font.
@@ -29,6 +33,114 @@ def get_style(name):
         base, style = name, None
     return base, style
 
+def save_coocc(path, labels, coocc):
+    """save a co-occurrence matrix in a sparse format.
+
+    only the nonzero cells are written, as coordinates into the label array
+
+    :param path: filepath, where to save the matrix (.npz)
+    :type path: str
+    :param labels: unicode decimals for the rows/columns of the matrix
+    :type labels: array-like
+    :param coocc: character co-occurrence matrix
+    :type coocc: scipy sparse matrix
+    """
+    coocc = sparse.coo_matrix(coocc)
+    np.savez_compressed(
+        path,
+        labels=np.asarray(labels, dtype=np.int64),
+        row=coocc.row.astype(np.int32),
+        col=coocc.col.astype(np.int32),
+        data=coocc.data,
+        shape=np.array(coocc.shape)
+    )
+
+def load_coocc(path):
+    """load a sparse co-occurrence matrix without densifying it.
+
+    :param path: filepath, a matrix saved with save_coocc() (.npz)
+    :type path: str
+    :returns: unicode decimal labels and the co-occurrence matrix
+    :rtype: tup
+    """
+    with np.load(path) as npz:
+        labels = npz['labels']
+        coocc = sparse.coo_matrix(
+            (npz['data'], (npz['row'], npz['col'])),
+            shape=tuple(npz['shape'])
+        )
+    return labels, coocc.tocsr()
+
+def groups_to_coocc(groups):
+    """build a co-occurrence matrix from groups of characters.
+
+    :param groups: unicode decimals that share a glyph
+    :type groups: iterable
+    :returns: unicode decimal labels and the co-occurrence matrix
+    :rtype: tup
+    """
+    groups = [list(group) for group in groups]
+    sizes = [len(group) for group in groups]
+    decs = np.fromiter(
+        (dec for group in groups for dec in group),
+        dtype=np.int64,
+        count=sum(sizes)
+    )
+    labels, cols = np.unique(decs, return_inverse=True)
+    rows = np.repeat(np.arange(len(groups)), sizes)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(decs), dtype=np.int64), (rows, cols.ravel())),
+        shape=(len(groups), len(labels))
+    )
+    return labels, (incidence.T @ incidence).tocsr()
+
+def flatten_groups(groups):
+    """flatten homoglyph groups into one entry per decimal.
+
+    :param groups: group number--unicode decimals pairs
+    :type groups: dict
+    :returns: unicode decimals and the group in which each appears
+    :rtype: tup
+    """
+    sizes = [len(decs) for decs in groups.values()]
+    dec = np.fromiter(
+        (dec for decs in groups.values() for dec in decs),
+        dtype=np.int64,
+        count=sum(sizes)
+    )
+    group = np.repeat(np.array(list(groups.keys()), dtype=np.int64), sizes)
+    return dec, group
+
+def group_record(name, groups):
+    """create a dataframe of a font's homoglyph groups, one row per decimal.
+
+    :param name: font name
+    :type name: str
+    :param groups: group number--unicode decimals pairs. a group translates to 
+        a homoglyph
+    :type groups: dict
+    :returns: a table of all homoglyphs in the font
+    :rtype: pandas dataframe
+    """
+    base, style = get_style(name)
+    # flatten the group--decimals lists into one row per decimal, noting the 
+    # group in which each decimal appears
+    dec, group = flatten_groups(groups)
+    # gather the unicode hex, name, and category of every decimal from the 
+    # lookup table; supply the filename (which will be the index) as well as 
+    # the base font and its style
+    hexes, names, categories = lookup(dec)
+    n_rows = len(dec)
+    return pd.DataFrame({
+        'DEC': dec,
+        'HEX': hexes,
+        'NAME': names,
+        'CAT': categories,
+        'FONT': pd.Categorical([base] * n_rows),
+        'STYLE': pd.Categorical([style] * n_rows),
+        'GROUP': group
+    }, index=pd.Index([name] * n_rows, name='FILE'))
+
 class HomoglyphJSON:
 
     def __init__(self, filename, indir):
@@ -56,61 +168,17 @@ class HomoglyphJSON:
         :returns: a table of all homoglyphs in the font
         :rtype: pandas dataframe
         """
-        # make a 1xn_group dataframe, where each col has a list of decimals
-        df = pd.json_normalize(self.data)
-        # transpose it, explode the lists into rows, and rename the column
-        df = (
-            df
-            .T
-            .explode(0)
-            .rename(columns={0: 'DEC'})
-        )
-        # for each decimal, find its unicode name and category
-        names = []
-        categories = []
-        for char in df['DEC'].apply(chr):
-            try:
-                names.append(unicodedata.name(char))
-                categories.append(unicodedata.category(char))
-            except:
-                names.append(None)
-                categories.append(None)
-        # for each decimal, assign the unicode hex, name, and category; 
-        # supply the filename (which will be the index) as well as the base font
-        # and its style; record the group in which the decimal appears. a group 
-        # translates to a homoglyph. set the index to filename and reorder
-        # the columns
-        reordered = ['DEC', 'HEX', 'NAME', 'CAT', 'FONT', 'STYLE', 'GROUP']
-        df = (
-            df
-            .assign(
-                HEX=df['DEC'].apply(hex),
-                NAME=names,
-                CAT=categories,
-                FILE=self.name,
-                FONT=self.base,
-                STYLE=self.style,
-                GROUP=df.index
-            )
-            .set_index('FILE')
-            .reindex(columns=reordered)
-        )
-        # finally, assign some datatypes
-        df = (
-            df
-            .assign(
-                DEC=df['DEC'].astype(int),
-                GROUP=df['GROUP'].astype(int)
-            )
-        )
-        return df
+        return group_record(self.name, self.data)
 
 class FontTable:
 
     def __init__(self, filename, indir):
         """initialize by loading the data.
 
-        once the data is loaded, assign the name and get the font base and style
+        co-occurrences are held as a sparse matrix, whatever the file format: 
+        sparse co-occurrences (.npz), a dense co-occurrence table (.csv), or 
+        homoglyph groups (.json). once the data is loaded, assign the name and 
+        get the font base and style
 
         :param filename: file to use
         :type filename: str
@@ -118,13 +186,42 @@ class FontTable:
         :type indir: str
         """
         path = os.path.join(indir, filename)
-        self.coocc = pd.read_csv(path, index_col=0)
-        self.name = filename.replace(".csv", "")
+        if filename.endswith(".npz"):
+            self.labels, self.coocc = load_coocc(path)
+        elif filename.endswith(".json"):
+            with open(path, 'r') as j:
+                self.labels, self.coocc = groups_to_coocc(json.load(j).values())
+        else:
+            self.labels, self.coocc = self._read_csv(path)
+        self.name = os.path.splitext(filename)[0]
         self.base, self.style = get_style(self.name)
-        self.n_dec = len(self.coocc.columns)
+        self.n_dec = len(self.labels)
         self.n_homoglyphs = self._count_homoglyphs()
         self.record = self._make_record()
 
+    @staticmethod
+    def _read_csv(path, chunksize=2048):
+        """read a dense co-occurrence table into a sparse matrix.
+
+        the table is read a block of rows at a time, so only one block is ever 
+        dense
+
+        :param path: filepath, a co-occurrence table
+        :type path: str
+        :param chunksize: rows per block
+        :type chunksize: int
+        :returns: unicode decimal labels and the co-occurrence matrix
+        :rtype: tup
+        """
+        blocks = []
+        for chunk in pd.read_csv(path, index_col=0, chunksize=chunksize):
+            # fonts without any glyphs are written as a one-cell placeholder
+            if list(chunk.columns) == ['DEC']:
+                return np.array([], dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.int64)
+            blocks.append(sparse.csr_matrix(chunk.fillna(0).to_numpy(dtype=np.int64)))
+            labels = chunk.columns.astype(np.int64).to_numpy()
+        return labels, sparse.vstack(blocks, format='csr')
+
     def _count_homoglyphs(self):
         """find the number of rows where the sum of row values is over 1.
 
@@ -133,8 +230,8 @@ class FontTable:
         :returns: number of homoglyphs in the font
         :rtype: int
         """
-        homoglyph_rows = self.coocc[self.coocc.sum(axis=1) > 1]
-        return len(homoglyph_rows)
+        row_sums = np.asarray(self.coocc.sum(axis=1)).ravel()
+        return int((row_sums > 1).sum())
 
     def _make_record(self):
         """create a small dataframe of high level metadata about the font.
@@ -150,30 +247,156 @@ class FontTable:
         }, index=[self.name])
         return record
 
-    @staticmethod
-    def _get_homoglyph_group(row):
-        """for rows with 2+ entries, return the decimals of each character.
-
-        :param row: a row in the glypyh--unicode decimal table
-        :type row: pandas series
-        :returns: group of characters with the same glyph
-        :rtype: list
-        """
-        mask = row.to_numpy().nonzero()
-        nonzero = row.iloc[mask]
-        return nonzero.index.tolist()
-
     def homoglyph_groups(self):
         """find the unique set of decimal groups for each homoglyph.
 
+        groups are the connected components of the co-occurrence matrix that 
+        have 2+ characters
+
         :returns: all homoglyph groups in a font
         :rtype: list
         """
-        homoglyphs = self.coocc[self.coocc.sum(axis=1) > 1]
-        groups = []
-        for dec in homoglyphs.index:
-            group = self._get_homoglyph_group(homoglyphs.loc[dec])
-            groups.append(group)
-        to_tuple = map(tuple, groups)
-        return [list(group) for group in set(to_tuple)]
+        if self.n_dec == 0:
+            return []
+        _, components = connected_components(self.coocc, directed=False)
+        sizes = np.bincount(components)
+        grouped = np.flatnonzero(sizes[components] > 1)
+        grouped = grouped[np.argsort(components[grouped], kind='stable')]
+        bounds = np.flatnonzero(np.diff(components[grouped])) + 1
+        return [self.labels[group].tolist() for group in np.split(grouped, bounds)] if len(grouped) else []
+
+def _load_record(filename, indir):
+    """load one per-font output as the decimals and groups of its homoglyphs.
+
+    only plain arrays are returned, so workers don't build tables that the 
+    parent would have to send back and then stack
+
+    :param filename: file to use (.json, .npz, or .csv)
+    :type filename: str
+    :param indir: location of file
+    :type indir: str
+    :returns: font name, unicode decimals, and the group of each decimal
+    :rtype: tup
+    """
+    if filename.endswith(".json"):
+        with open(os.path.join(indir, filename), 'r') as j:
+            groups = json.load(j)
+        name = filename.replace(".json", "")
+    else:
+        table = FontTable(filename, indir)
+        name, groups = table.name, dict(enumerate(table.homoglyph_groups()))
+    return (name,) + flatten_groups(groups)
+
+def _repeat_categorical(values, sizes):
+    """repeat one value per table into a categorical column.
+
+    :param values: one value per table
+    :type values: list
+    :param sizes: number of rows in each table
+    :type sizes: list
+    :returns: the repeated values
+    :rtype: pandas categorical
+    """
+    per_table = pd.Categorical(values)
+    return pd.Categorical.from_codes(
+        np.repeat(per_table.codes, sizes),
+        categories=per_table.categories
+    )
+
+def concat_records(records):
+    """stack per-font homoglyphs into one table.
 
+    unicode data is gathered once for the whole table and font columns are 
+    built from the file names, so no per-font tables or categorical columns 
+    need merging
+
+    :param records: font name--unicode decimals--groups triples made by 
+        _load_record()
+    :type records: list
+    :returns: a table of the homoglyphs in every font
+    :rtype: pandas dataframe
+    """
+    records = [record for record in records if len(record[1])]
+    if not records:
+        return group_record("", {})
+
+    files, decs, groups = zip(*records)
+    sizes = [len(dec) for dec in decs]
+    bases, styles = zip(*(get_style(name) for name in files))
+    dec = np.concatenate(decs)
+    hexes, names, categories = lookup(dec)
+    return pd.DataFrame({
+        'DEC': dec,
+        'HEX': hexes,
+        'NAME': names,
+        'CAT': categories,
+        'FONT': _repeat_categorical(bases, sizes),
+        'STYLE': _repeat_categorical(styles, sizes),
+        'GROUP': np.concatenate(groups)
+    }, index=pd.CategoricalIndex(_repeat_categorical(files, sizes), name='FILE'))
+
+def load_directory(indir, n_cores=4):
+    """load every per-font output in a directory into one table.
+
+    files are loaded across a pool of workers. .json files are read as 
+    homoglyph groups; .npz and .csv files are read as co-occurrences and 
+    grouped
+
+    :param indir: location of the files
+    :type indir: str
+    :param n_cores: cores to use in multiprocessing
+    :type n_cores: int
+    :returns: a table of the homoglyphs in every font
+    :rtype: pandas dataframe
+    """
+    fnames = sorted(
+        f for f in os.listdir(indir)
+        if f.startswith('.') is False and f.endswith(('.json', '.npz', '.csv'))
+    )
+    print("+ Loading", len(fnames), "file(s)")
+    records = []
+    with multiprocessing.Pool(n_cores) as pool:
+        to_pool = partial(_load_record, indir=indir)
+        for count, record in enumerate(pool.imap(to_pool, fnames, chunksize=8), 1):
+            records.append(record)
+            if count % 100 == 0:
+                print(f"+ Loaded {count} of {len(fnames)} file(s)")
+    print("+ Combining tables")
+    return concat_records(records)
+
+def save_records(records, path):
+    """save a homoglyph table in a columnar format.
+
+    the format follows the file extension: .parquet or .feather. both need 
+    pyarrow
+
+    :param records: a table made by group_record() or load_directory()
+    :type records: pandas dataframe
+    :param path: filepath, where to save the table
+    :type path: str
+    """
+    if path.endswith(".parquet"):
+        records.to_parquet(path)
+    elif path.endswith(".feather"):
+        # feather files can't hold an index, so keep the files as a column
+        records.reset_index().to_feather(path)
+    else:
+        raise ValueError("Save as .parquet or .feather")
+
+def read_records(path):
+    """read a homoglyph table saved with save_records().
+
+    feather files are memory-mapped rather than read into memory up front
+
+    :param path: filepath, a .parquet or .feather file
+    :type path: str
+    :returns: a table of homoglyphs
+    :rtype: pandas dataframe
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, memory_map=True)
+    if path.endswith(".feather"):
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas().set_index('FILE')
+    raise ValueError("Read a .parquet or .feather file")
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import json
+from functools import lru_cache
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from fontTools.unicodedata import script
+
+# scripts that are routinely written together count as one
+SCRIPT_ALIASES = {
+    'Hira': 'Hani',
+    'Kana': 'Hani',
+    'Hrkt': 'Hani',
+    'Hang': 'Hani'
+}
+# common (e.g. µ), inherited (combining marks), and unknown characters are used
+# with every script, so they never make a token mixed
+SHARED_SCRIPTS = {'Zyyy', 'Zinh', 'Zzzz'}
+TOKEN = re.compile(r"\S+")
+N_CODEPOINTS = 0x110000
+
+def read_confusables(path):
+    """read a confusables file into pairs of confusable code points.
+
+    keys are the base forms; some are sequences of code points (e.g.
+    "0306,0307"), which are returned separately
+
+    :param path: filepath, a confusables file (.json) mapping a hex base form to
+        the hex code points confusable with it
+    :type path: str
+    :returns: (base, confusable) decimal pairs, and confusable decimal--base
+        sequence pairs
+    :rtype: tup
+    """
+    with open(path, 'r') as f:
+        confusables = json.load(f)
+    pairs, sequences = [], {}
+    for key, values in confusables.items():
+        base = [int(part, 16) for part in key.split(",")]
+        for value in values:
+            if len(base) == 1:
+                pairs.append((base[0], int(value, 16)))
+            else:
+                sequences[int(value, 16)] = base
+    return pairs, sequences
+
+def font_pairs(groups, min_fonts=2):
+    """count the fonts in which pairs of characters share a glyph.
+
+    a font has each character in at most one group, so the number of groups a
+    pair turns up in is the number of fonts it shares a glyph in. the groups 
+    are held as a sparse group-by-character incidence matrix, whose product 
+    with itself counts every pair at once
+
+    :param groups: homoglyph groups of any number of fonts
+    :type groups: iterable
+    :param min_fonts: fewest fonts a pair must share a glyph in to be kept
+    :type min_fonts: int
+    :returns: (lower, higher) decimal pairs--number of fonts
+    :rtype: dict
+    """
+    groups = [list(group) for group in groups]
+    sizes = [len(group) for group in groups]
+    decs = np.fromiter(
+        (dec for group in groups for dec in group),
+        dtype=np.int64,
+        count=sum(sizes)
+    )
+    labels, cols = np.unique(decs, return_inverse=True)
+    rows = np.repeat(np.arange(len(groups)), sizes)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(decs), dtype=np.int64), (rows, cols.ravel())),
+        shape=(len(groups), len(labels))
+    )
+    # a character listed twice in a group still only counts once
+    incidence.data[:] = 1
+    counts = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    keep = counts.data >= min_fonts
+    pairs = zip(labels[counts.row[keep]].tolist(), labels[counts.col[keep]].tolist())
+    return dict(zip(pairs, counts.data[keep].tolist()))
+
+@lru_cache(maxsize=None)
+def script_of(char):
+    """find the script of a letter from the unicode script property.
+
+    :param char: a character
+    :type char: str
+    :returns: its four letter script code (e.g. Latn, Cyrl), or None if it
+        isn't a letter or is shared between scripts
+    :rtype: str
+    """
+    if not char.isalpha():
+        return None
+    code = script(char)
+    if code in SHARED_SCRIPTS:
+        return None
+    return SCRIPT_ALIASES.get(code, code)
+
+class Skeleton:
+
+    def __init__(self, table):
+        """initialize a normalizer from a translate table.
+
+        :param table: decimal--representative pairs, for str.translate()
+        :type table: dict
+        """
+        self.table = table
+        self._arrays = None
+
+    def _compile(self):
+        """lay the translate table out as arrays, for normalizing long text.
+
+        each code point maps to the first character of its skeleton. the few
+        skeletons with more characters (e.g. m => rn) keep the rest in a flat
+        array, starting at their offset
+
+        :returns: first characters, extra lengths, extra offsets, and the flat
+            array of extras
+        :rtype: tup
+        """
+        first = np.arange(N_CODEPOINTS, dtype=np.uint32)
+        n_extra = np.zeros(N_CODEPOINTS, dtype=np.int64)
+        for dec, rep in self.table.items():
+            first[dec] = ord(rep[0])
+            n_extra[dec] = len(rep) - 1
+        offsets = np.cumsum(n_extra) - n_extra
+        extras = np.empty(n_extra.sum(), dtype=np.uint32)
+        for dec, rep in self.table.items():
+            extras[offsets[dec]:offsets[dec] + n_extra[dec]] = [ord(char) for char in rep[1:]]
+        return first, n_extra.astype(np.uint8), offsets, extras
+
+    @classmethod
+    def build(cls, confusables=None, groups=(), min_fonts=2):
+        """compile confusables and homoglyph groups into a translate table.
+
+        every character is joined to the characters it's confusable with.
+        pairs that share a glyph in at least min_fonts fonts are then taken
+        from the most fonts to the fewest, and may join a character to a set
+        or two sets together. they never join two sets from the confusables,
+        and only join sets if every character the fonts brought into one
+        shares a glyph with every one they brought into the other, so a glyph
+        shared by chance can't chain sets together. each set then maps to its
+        lowest base form from the confusables, or its lowest code point if it
+        has none. confusables whose base form is a sequence map to that
+        sequence
+
+        :param confusables: filepath, a confusables file (.json)
+        :type confusables: str
+        :param groups: homoglyph groups, e.g. from FontTable.homoglyph_groups(),
+            of any number of fonts
+        :type groups: iterable
+        :param min_fonts: fewest fonts two characters must share a glyph in
+        :type min_fonts: int
+        :returns: the normalizer
+        :rtype: Skeleton
+        """
+        pairs, sequences = [], {}
+        if confusables is not None:
+            pairs, sequences = read_confusables(confusables)
+        bases = np.array(sorted(set(base for base, _ in pairs)), dtype=np.int64)
+        shared = font_pairs(groups, min_fonts)
+
+        table = {}
+        if pairs or shared:
+            decs = np.unique(np.array(pairs + list(shared), dtype=np.int64))
+            idx = np.searchsorted(decs, np.array(pairs, dtype=np.int64).reshape(-1, 2))
+            graph = sparse.coo_matrix(
+                (np.ones(len(idx)), (idx[:, 0], idx[:, 1])),
+                shape=(len(decs), len(decs))
+            )
+            _, components = connected_components(graph, directed=False)
+            curated = set(components[idx.ravel()].tolist())
+
+            # the characters in each set, and the ones fonts brought into it
+            rows = {}
+            for row, label in enumerate(components.tolist()):
+                rows.setdefault(label, []).append(row)
+            added = {label: rows[label] for label in rows if label not in curated}
+            pos = {dec: row for row, dec in enumerate(decs.tolist())}
+            for (a, b), _ in sorted(shared.items(), key=lambda item: (-item[1], item[0])):
+                label_a, label_b = components[pos[a]], components[pos[b]]
+                if label_a == label_b or (label_a in curated and label_b in curated):
+                    continue
+                added_a, added_b = added.get(label_a, []), added.get(label_b, [])
+                if any(
+                    tuple(sorted((int(decs[u]), int(decs[v])))) not in shared
+                    for u in added_a for v in added_b
+                ):
+                    continue
+                # keep the label of a set from the confusables
+                if label_b in curated:
+                    label_a, label_b = label_b, label_a
+                components[rows[label_b]] = label_a
+                rows[label_a] += rows.pop(label_b)
+                added[label_a] = added_a + added_b
+                added.pop(label_b, None)
+
+            # rank base forms ahead of everything else
+            ranks = np.where(np.isin(decs, bases), decs, decs + N_CODEPOINTS)
+            reps = np.full(components.max() + 1, np.iinfo(np.int64).max)
+            np.minimum.at(reps, components, ranks)
+            reps %= N_CODEPOINTS
+            table = {
+                int(dec): chr(rep)
+                for dec, rep in zip(decs, reps[components]) if dec != rep
+            }
+        for dec, base in sequences.items():
+            if dec not in table:
+                table[dec] = ''.join(table.get(part, chr(part)) for part in base)
+        return cls(table)
+
+    @classmethod
+    def load(cls, path):
+        """load a compiled translate table.
+
+        :param path: filepath, a table saved with save() (.json)
+        :type path: str
+        :returns: the normalizer
+        :rtype: Skeleton
+        """
+        with open(path, 'r') as f:
+            return cls({int(dec): rep for dec, rep in json.load(f).items()})
+
+    def save(self, path):
+        """save the translate table.
+
+        :param path: filepath, where to save the table (.json)
+        :type path: str
+        """
+        with open(path, 'w') as f:
+            json.dump(self.table, f, ensure_ascii=False)
+
+    def normalize(self, text):
+        """map every character to its group's representative.
+
+        :param text: text to normalize
+        :type text: str
+        :returns: the skeleton of the text
+        :rtype: str
+        """
+        # short strings aren't worth the trip through numpy
+        if len(text) < 256:
+            return text.translate(self.table)
+        if self._arrays is None:
+            self._arrays = self._compile()
+        first, n_extra, offsets, extras = self._arrays
+        decs = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+        skeleton = first[decs]
+        hits = np.flatnonzero(n_extra[decs])
+        if len(hits):
+            # slot the rest of each longer skeleton in after its first character
+            counts = n_extra[decs[hits]].astype(np.int64)
+            ends = np.cumsum(counts)
+            idx = np.repeat(offsets[decs[hits]] - (ends - counts), counts) + np.arange(ends[-1])
+            skeleton = np.insert(skeleton, np.repeat(hits + 1, counts), extras[idx])
+        return skeleton.tobytes().decode('utf-32-le')
+
+    def flag(self, token):
+        """check a token for mixed scripts or spoofing.
+
+        a token is MIXED if its letters come from more than one script, and
+        SPOOF if it has non-ascii letters that pass for ascii ones (e.g. a
+        cyrillic а in "pаypal")
+
+        :param token: a token
+        :type token: str
+        :returns: the token's skeleton and its flags
+        :rtype: tup
+        """
+        skeleton = token.translate(self.table)
+        if token.isascii():
+            return skeleton, []
+        flags = []
+        scripts = set(script_of(char) for char in token)
+        scripts.discard(None)
+        if len(scripts) > 1:
+            flags.append('MIXED')
+        if any(
+            char.isalpha() and not char.isascii() and self.table.get(ord(char), char).isascii()
+            for char in token
+        ):
+            flags.append('SPOOF')
+        return skeleton, flags
+
+    def flag_line(self, line):
+        """find flagged tokens in a line.
+
+        :param line: a line of text
+        :type line: str
+        :returns: token, skeleton, and flags for every flagged token
+        :rtype: generator
+        """
+        # most lines are plain ascii, which can't be flagged
+        if line.isascii():
+            return
+        for token in TOKEN.findall(line):
+            skeleton, flags = self.flag(token)
+            if flags:
+                yield token, skeleton, flags
+
+    def scan(self, lines):
+        """find flagged tokens in a stream of lines.
+
+        :param lines: lines of text
+        :type lines: iterable
+        :returns: line number, token, skeleton, and flags for every flagged token
+        :rtype: generator
+        """
+        for lineno, line in enumerate(lines, 1):
+            for token, skeleton, flags in self.flag_line(line):
+                yield lineno, token, skeleton, flags
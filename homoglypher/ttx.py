@@ -1,45 +1,111 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from bs4 import BeautifulSoup
+from collections import namedtuple
+from xml.etree import ElementTree
+import numpy as np
+
+# a reference to another glyph, drawn at an offset
+Component = namedtuple('Component', ['glyphname', 'x', 'y', 'flags'])
 
 class Font:
-    
-    order = {}
-    order_rev = {}
-    cmap = {}
-    chars = []
 
     def __init__(self, filename):
-        with open(filename, 'r') as f:
-            soup = BeautifulSoup(f.read(), 'lxml')
-            for item in soup.find_all('glyphid'):
-                idx = int(item['id'])
-                name = item['name']
+        """load a font from a .ttx dump.
+
+        the file is streamed in one pass and each glyph is decoded as soon as
+        it has been read. every element is dropped afterwards, so memory stays
+        bounded by the decoded outlines rather than the size of the dump
+
+        :param filename: filepath, a .ttx file
+        :type filename: str
+        """
+        self.order = {}
+        self.order_rev = {}
+        self.cmap = {}
+        self.glyphs = {}
+        self._outlines = {}
+
+        stack = []
+        in_glyph = False
+        for event, elem in ElementTree.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                in_glyph = in_glyph or elem.tag == 'TTGlyph'
+                continue
+
+            stack.pop()
+            if elem.tag == 'TTGlyph':
+                in_glyph = False
+                char = self.Char.from_ttx(elem)
+                self.glyphs[char.name] = char
+            elif in_glyph:
+                # keep the outline under its glyph until the glyph is decoded
+                continue
+            elif elem.tag == 'GlyphID':
+                idx = int(elem.get('id'))
+                name = elem.get('name')
                 self.order[idx] = name
                 self.order_rev[name] = idx
-                data = soup.find('ttglyph', {'name': name})
-                if data:
-                    self.chars.append(self.Char(data))
-            for item in soup.find_all('map'):
-                self.cmap[item['name']] = item['code']
+            elif elem.tag == 'map':
+                self.cmap[elem.get('name')] = elem.get('code')
+
+            # every earlier sibling is already gone, so this is a cheap removal
+            if stack:
+                stack[-1].remove(elem)
+
+        # ttx writes glyphs sorted by name; keep them in glyph order
+        self.chars = [
+            self.glyphs[name] for _, name in sorted(self.order.items())
+            if name in self.glyphs
+        ]
         self.n_char = len(self.cmap)
 
+    def outline(self, name):
+        """return a glyph's full outline, with nested components put in place.
+
+        outlines are resolved once per glyph and reused by every glyph that
+        refers to them
+
+        :param name: name of the glyph
+        :type name: str
+        :returns: point coordinates, on-curve flags, and contour end indices
+        :rtype: tup
+        """
+        if name in self._outlines:
+            return self._outlines[name]
+
+        char = self.glyphs[name]
+        points, on_curve, end_pts = [char.points], [char.on_curve], [char.end_pts]
+        offset = len(char.points)
+        for component in char.components:
+            sub_points, sub_on_curve, sub_end_pts = self.outline(component.glyphname)
+            points.append(sub_points + (component.x, component.y))
+            on_curve.append(sub_on_curve)
+            end_pts.append(sub_end_pts + offset)
+            offset += len(sub_points)
+
+        outline = (
+            np.concatenate(points),
+            np.concatenate(on_curve),
+            np.concatenate(end_pts)
+        )
+        self._outlines[name] = outline
+        return outline
+
     def get_component_contours(self, idx):
         char = self.chars[idx]
         if char.components:
             component_contours = []
             for component in char.components:
-                name = component['glyphname']
-                idx = self.order_rev[name]                
-                contours = self.chars[idx].contours
+                points, _, end_pts = self.outline(component.glyphname)
                 component_contours.append({
-                    'name': name,
+                    'name': component.glyphname,
                     'position': {
-                        'x': component['x'],
-                        'y': component['y']
+                        'x': component.x,
+                        'y': component.y
                     },
-                    'contours': contours
+                    'contours': self.Char.split_contours(points, end_pts)
                 })
             return component_contours
         else:
@@ -47,72 +113,102 @@ class Font:
 
     class Char:
 
-        def __init__(self, data):
-            self.data = data
-            self.name = data['name']
+        def __init__(self, name, bounds=None, points=None, on_curve=None, end_pts=None, components=()):
+            """initialize a glyph from its decoded geometry.
+
+            :param name: name of the glyph
+            :type name: str
+            :param bounds: (xmin, ymin, xmax, ymax), or None for an empty glyph
+            :type bounds: tup
+            :param points: n x 2 point coordinates
+            :type points: numpy array
+            :param on_curve: n on-curve flags
+            :type on_curve: numpy array
+            :param end_pts: index of the last point of each contour
+            :type end_pts: numpy array
+            :param components: glyphs this glyph refers to
+            :type components: iterable
+            """
+            self.name = name
+            self._bounds = bounds
+            self.points = np.zeros((0, 2), dtype=np.int32) if points is None else points
+            self.on_curve = np.zeros(0, dtype=bool) if on_curve is None else on_curve
+            self.end_pts = np.zeros(0, dtype=np.int32) if end_pts is None else end_pts
+            self.components = tuple(components)
+
+        @classmethod
+        def from_ttx(cls, data):
+            """decode a glyph from its TTGlyph element.
+
+            :param data: a TTGlyph element
+            :type data: xml element
+            :returns: the decoded glyph
+            :rtype: Char
+            """
+            bounds = None
+            if len(data):
+                bounds = tuple(int(data.get(key)) for key in ('xMin', 'yMin', 'xMax', 'yMax'))
+
+            coords, flags, end_pts = [], [], []
+            for contour in data.iter('contour'):
+                for pt in contour.iter('pt'):
+                    coords.append((int(pt.get('x')), int(pt.get('y'))))
+                    flags.append(int(pt.get('on')) & 1)
+                end_pts.append(len(coords) - 1)
+
+            components = [
+                Component(
+                    component.get('glyphName'),
+                    int(component.get('x')),
+                    int(component.get('y')),
+                    component.get('flags')
+                )
+                for component in data.iter('component')
+            ]
+            return cls(
+                data.get('name'),
+                bounds,
+                np.array(coords, dtype=np.int32).reshape(-1, 2),
+                np.array(flags, dtype=bool),
+                np.array(end_pts, dtype=np.int32),
+                components
+            )
+
+        @staticmethod
+        def split_contours(points, end_pts):
+            """split points into one array per contour.
+
+            :param points: n x 2 point coordinates
+            :type points: numpy array
+            :param end_pts: index of the last point of each contour
+            :type end_pts: numpy array
+            :returns: point coordinates of each contour
+            :rtype: list
+            """
+            return np.split(points, end_pts[:-1] + 1) if len(end_pts) else []
 
         @property
         def bounds(self):
-            if list(self.data.children):
-                return {
-                    'xmax': int(self.data['xmax']),
-                    'xmin': int(self.data['xmin']),
-                    'ymax': int(self.data['ymax']),
-                    'ymin': int(self.data['ymin'])
-                }
-            else:
+            if self._bounds is None:
                 return None
+            xmin, ymin, xmax, ymax = self._bounds
+            return {'xmax': xmax, 'xmin': xmin, 'ymax': ymax, 'ymin': ymin}
 
         @property
         def contours(self):
-            if self.data.find('contour'):
-                contours = []
-                for contour in self.data.find_all('contour'):
-                    stroke = []
-                    points = contour.find_all('pt')
-                    for pt in points:
-                        stroke.append({
-                            'on': pt['on'],
-                            'x': pt['x'],
-                            'y': pt['y'],
-                        })
-                    contours.append(stroke)
-                return contours
+            if len(self.end_pts):
+                return self.split_contours(self.points, self.end_pts)
             else:
                 return None
 
         @property
         def n_contours(self):
-            if self.contours:
-                return len(self.contours)
-            else:
-                return 0
-
-        @property
-        def components(self):
-            if self.data.find('component'):
-                components = []
-                for component in self.data.find_all('component'):
-                    components.append({
-                        'flags': component['flags'],
-                        'glyphname': component['glyphname'],
-                        'x': int(component['x']),
-                        'y': int(component['y'])
-                    })
-                return components
-            else:
-                return None
+            return len(self.end_pts)
 
         @property
         def n_components(self):
-            if self.components:
-                return len(self.components)
-            else:
-                return 0
+            return len(self.components)
 
         @property
         def null_char(self):
-            if (self.bounds is None) and (self.contours is None) and (self.components is None):
-                return True
-            else:
-                return False
+            return self._bounds is None and not len(self.end_pts) and not self.components
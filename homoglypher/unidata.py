@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unicodedata
+import numpy as np
+import pandas as pd
+
+N_CODEPOINTS = 0x110000
+
+# every general category, in a fixed order so their codes are stable
+CATEGORIES = [
+    'Cc', 'Cf', 'Cn', 'Co', 'Cs',
+    'Ll', 'Lm', 'Lo', 'Lt', 'Lu',
+    'Mc', 'Me', 'Mn',
+    'Nd', 'Nl', 'No',
+    'Pc', 'Pd', 'Pe', 'Pf', 'Pi', 'Po', 'Ps',
+    'Sc', 'Sk', 'Sm', 'So',
+    'Zl', 'Zp', 'Zs'
+]
+
+# built on first use and shared by everything in this process
+_table = None
+
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+# code points take at most 6 hex digits
+HEX_WIDTH = 6
+
+def _build_table():
+    """look up the name and category of every unicode code point.
+
+    code points without a name get neither a name nor a category, which is how
+    records have always treated them
+
+    :returns: names (None where missing) and category codes (-1 where missing)
+    :rtype: tup
+    """
+    codes = {cat: idx for idx, cat in enumerate(CATEGORIES)}
+    names = np.empty(N_CODEPOINTS, dtype=object)
+    cats = np.full(N_CODEPOINTS, -1, dtype=np.int8)
+    for dec in range(N_CODEPOINTS):
+        char = chr(dec)
+        name = unicodedata.name(char, None)
+        if name is not None:
+            names[dec] = name
+            cats[dec] = codes[unicodedata.category(char)]
+    return names, cats
+
+def unicode_table():
+    """return the name and category lookup, building it if needed.
+
+    :returns: names (None where missing) and category codes (-1 where missing),
+        indexed by unicode decimal
+    :rtype: tup
+    """
+    global _table
+    if _table is None:
+        _table = _build_table()
+    return _table
+
+def hex_strings(decs):
+    """format unicode decimals the way hex() does (e.g. 0x41), all at once.
+
+    every code point's digits are split out with shifts, leading zeros are
+    dropped by moving the digits left, and the rows are read as strings
+
+    :param decs: unicode decimals
+    :type decs: numpy array
+    :returns: hex strings
+    :rtype: numpy array
+    """
+    shifts = np.arange(HEX_WIDTH - 1, -1, -1) * 4
+    nibbles = (decs[:, None] >> shifts) & 0xF
+    # the first digit to keep; zero keeps its last one
+    first = np.where(nibbles.any(axis=1), (nibbles != 0).argmax(axis=1), HEX_WIDTH - 1)
+    cols = np.arange(HEX_WIDTH) + first[:, None]
+    digits = HEX_DIGITS[np.take_along_axis(nibbles, np.minimum(cols, HEX_WIDTH - 1), axis=1)]
+
+    chars = np.zeros((len(decs), HEX_WIDTH + 2), dtype=np.uint8)
+    chars[:, 0], chars[:, 1] = ord('0'), ord('x')
+    # trailing null bytes are dropped when the rows are read as strings
+    chars[:, 2:] = np.where(cols < HEX_WIDTH, digits, 0)
+    return chars.view(f"S{HEX_WIDTH + 2}").ravel().astype(f"U{HEX_WIDTH + 2}").astype(object)
+
+def lookup(decs):
+    """gather the hex, name, and category of many code points at once.
+
+    names are returned as a categorical whose categories are the distinct names,
+    in code point order
+
+    :param decs: unicode decimals
+    :type decs: array-like
+    :returns: hex strings, names, and categories
+    :rtype: tup
+    """
+    decs = np.asarray(decs, dtype=np.int64)
+    names, cats = unicode_table()
+
+    # each code point has its own name, so the distinct code points give the 
+    # name categories without hashing any strings
+    uniq, inverse = np.unique(decs, return_inverse=True)
+    hexes = hex_strings(uniq)[inverse.ravel()]
+    named = cats[uniq] >= 0
+    name_codes = np.where(named, np.cumsum(named) - 1, -1)[inverse.ravel()]
+    names = pd.Categorical.from_codes(name_codes, categories=names[uniq[named]])
+
+    categories = pd.Categorical.from_codes(cats[decs], categories=CATEGORIES)
+    return hexes, names, categories
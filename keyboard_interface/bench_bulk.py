@@ -0,0 +1,59 @@
+import io, time, random
+from argparse import ArgumentParser
+import numpy as np
+from substitutions import (
+    load_confusables, load_sub_manifold, compile_tables, homoglyph_sub, substitute_stream
+)
+
+def make_text(n_chars, seed=0):
+    # mostly ascii prose-like text, with some accented and non-latin characters
+    rng = np.random.default_rng(seed)
+    alphabet = list("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,;:!?'\"()-")
+    alphabet += list("éüñßøåçαβγδεжзийкл")
+    alphabet += [" "] * 15 + ["\n"]
+    return ''.join(rng.choice(alphabet, size=n_chars))
+
+def per_char(text, confusables, operator_chars):
+    # the keystroke path, one character at a time
+    return ''.join(
+        char if char in operator_chars else homoglyph_sub(char, confusables)
+        for char in text
+    )
+
+def main(args):
+    confusables = load_confusables()
+    sub_manifold = load_sub_manifold()
+    tables = compile_tables(confusables, sub_manifold)
+    operator_chars = set(sub_manifold['operators'].values())
+    text = make_text(args.n_chars)
+    n_mb = len(text.encode('utf-8')) / 1024 ** 2
+
+    print("MODE\tCHUNK\tSECONDS\tMB/S")
+    random.seed(0)
+    start = time.perf_counter()
+    per_char(text, confusables, operator_chars)
+    elapsed = time.perf_counter() - start
+    print(f"per-char\t-\t{elapsed:.2f}\t{n_mb / elapsed:.1f}")
+
+    for chunk_size in args.chunk_size:
+        infile, outfile = io.StringIO(text), io.StringIO()
+        start = time.perf_counter()
+        substitute_stream(infile, outfile, tables, np.random.default_rng(0), chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"bulk\t{chunk_size}\t{elapsed:.2f}\t{n_mb / elapsed:.1f}")
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--n_chars',
+        type=int,
+        default=20_000_000
+    )
+    parser.add_argument(
+        '--chunk_size',
+        type=int,
+        nargs='+',
+        default=[1 << 16, 1 << 20, 1 << 22]
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,53 @@
+import io, sys
+from argparse import ArgumentParser
+import numpy as np
+from substitutions import (
+    load_confusables, load_sub_manifold, compile_tables, substitute_stream, Composer
+)
+
+def open_text(path, mode):
+    # '-' is stdin/stdout. newlines are passed through untouched, and undecodable
+    # bytes are replaced rather than stopping a long run
+    if path == '-':
+        stream = sys.stdin.buffer if mode == 'r' else sys.stdout.buffer
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+    return open(path, mode, encoding='utf-8', errors='replace', newline='')
+
+def main(args):
+    sub_manifold = load_sub_manifold()
+    tables = compile_tables(load_confusables(), sub_manifold)
+    composer = Composer(sub_manifold) if args.compose else None
+    rng = np.random.default_rng(args.seed)
+    with open_text(args.infile, 'r') as infile, open_text(args.outfile, 'w') as outfile:
+        substitute_stream(infile, outfile, tables, rng, args.chunk_size, composer)
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="homoglyph a text file or stdin, writing to stdout")
+    parser.add_argument(
+        '--infile',
+        type=str,
+        default='-'
+    )
+    parser.add_argument(
+        '--outfile',
+        type=str,
+        default='-'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help="seed the choice of substitutes, for reproducible test sets"
+    )
+    parser.add_argument(
+        '--chunk_size',
+        type=int,
+        default=1 << 20,
+        help="characters to substitute at a time"
+    )
+    parser.add_argument(
+        '--compose',
+        action='store_true',
+        help="compose dead keys with the character after them (e.g. ´e -> é), as the keyboard does"
+    )
+    args = parser.parse_args()
+    main(args)
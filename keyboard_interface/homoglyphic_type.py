@@ -1,80 +1,238 @@
-import json, random, unicodedata
-from pynput.keyboard import Listener
-
-with open("./data/unicode_confusables.json", 'r') as f:
-    confusables = json.load(f)
-    # remove confusables whose base forms need to be compiled
-    confusables = {k:v for k,v in confusables.items() if len(k)==4}
-    
-with open("./data/non_alphanumeric_subs.json", 'r') as f:
-    # a multi-level dictionary that contains various character substitutions for 
-    # non-alphanumeric keys
-	sub_manifold = json.load(f)
-    
-def homoglyph_sub(letter):
-    letter_hex = hex(ord(letter))
-    letter_hex = letter_hex.replace("x", "0")
-    if letter_hex.upper() in confusables.keys():
-        substitute = random.choice(confusables[letter_hex.upper()])
-        substitute = int(substitute, 16)
-        return str(chr(substitute))
-    else:
-        return letter
+import sys, time, queue, atexit, threading, unicodedata
+from argparse import ArgumentParser
+from collections import deque
+import numpy as np
+from substitutions import load_confusables, load_sub_manifold, homoglyph_sub, Composer
+
+confusables = load_confusables()
+sub_manifold = load_sub_manifold()
+composer = Composer(sub_manifold)
+
+class BufferedLog:
+    # one open file for the whole session. writes collect in memory and are
+    # flushed every few seconds, once enough have built up, and on exit
+    def __init__(self, path, interval=2.0, max_chars=4096):
+        self.f = open(path, 'a', encoding='utf-8')
+        self.buffer = []
+        self.n_chars = 0
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def _run(self, interval):
+        while not self.stopped.wait(interval):
+            self.flush()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer.append(text)
+            self.n_chars += len(text)
+            full = self.n_chars >= self.max_chars
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.f.closed:
+                return
+            if self.buffer:
+                self.f.write(''.join(self.buffer))
+                self.buffer = []
+                self.n_chars = 0
+            self.f.flush()
+
+    def close(self):
+        self.stopped.set()
+        self.flush()
+        with self.lock:
+            self.f.close()
+
+def char_width(char):
+    # wide (e.g. fullwidth) characters take up two terminal columns
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+def screen_update(added="", erased=""):
+    # what to write to update the screen by what changed, rather than reprinting
+    # the whole stream. erasing can't go back past a line break
+    columns = sum(char_width(char) for char in erased if char != "\n")
+    return "\b \b" * columns + added
+
+def display(update):
+    sys.stdout.write(update)
+    sys.stdout.flush()
 
 def filter_operators(letter):
     if letter in sub_manifold['operators'].keys():
         letter = sub_manifold['operators'][letter]
     else:
         letter = letter[1:-1]
-        letter = homoglyph_sub(letter)
+        letter = homoglyph_sub(letter, confusables)
     return letter
-    
-def handle_modifiers(letter):
+
+def handle_modifiers(letter, stream):
     # convert keyed modifier codes to modifiers
-    if letter in sub_manifold['modifiers'].keys():
-        letter = sub_manifold['modifiers'][letter]
-        
+    letter = sub_manifold['modifiers'].get(letter, letter)
+
     # compile accented characters by looking back one position in the homoglyph stream
-    # to see whether it's a compilable modifier
-    if len(homoglyph_stream) >= 1:
-        for char in homoglyph_stream[-1]:
-            char = "'{}'".format(char)
-            if char in sub_manifold['modifier_pairs'].keys():
-                try:
-                    letter = sub_manifold['modifier_pairs'][char][letter]
-                    homoglyph_stream[-1] = ""
-                # handle instances where two modifiers are typed in sequence (and thus
-                # not to be found in modifier_pairs)
-                except:
-                    pass
+    # to see whether it's a dead key. character keys come through quoted, e.g. 'a'
+    if len(stream) >= 1 and len(letter) == 3:
+        composed = composer.compose(stream[-1], letter[1:-1])
+        if composed is not None:
+            letter = "'{}'".format(composed)
+            stream[-1] = ""
     return letter
 
-homoglyph_stream = []
-def write_to_log(key):
-    letter = str(key)
+def process_key(letter, stream, log):
+    # substitute, compose, and log one key onto the homoglyph stream, returning
+    # its screen update. returns None once ESC ends the session
     if letter == "Key.backspace":
-        while len(homoglyph_stream) > 1:
-            return homoglyph_stream.pop()
-        else:
-            pass
-            
+        if len(stream) > 1:
+            return screen_update(erased=stream.pop())
+
     # ESC key = quit listening and logging
     if letter == "Key.esc":
-        with open("log_final.txt", 'w') as f:
-            f.writelines(homoglyph_stream)
-        return False
-        
-    letter = handle_modifiers(letter)
+        return None
+
+    previous = stream[-1] if stream else ""
+    letter = handle_modifiers(letter, stream)
     letter = filter_operators(letter)
-    with open("log.txt", 'a') as f:
-        f.write(letter)
-    homoglyph_stream.append(letter)
-    print("\n",''.join(homoglyph_stream))
-    
-def main():
+    log.write(letter)
+    stream.append(letter)
+    # a composed character replaces the modifier typed before it
+    erased = previous if len(stream) > 1 and stream[-2] == "" else ""
+    return screen_update(added=letter, erased=erased)
+
+def finish(stream, log, final_path="log_final.txt"):
+    log.close()
+    with open(final_path, 'w', encoding='utf-8') as f:
+        f.writelines(stream)
+
+class KeyPipeline:
+    # the listener callback only timestamps and queues raw keys. a worker thread
+    # drains the queue in batches, processes them, and renders each batch with
+    # one write, so a slow terminal or disk never holds up the listener
+    def __init__(self, log, stream=None, render=display, batch_size=256, final_path="log_final.txt"):
+        self.events = queue.SimpleQueue()
+        self.log = log
+        self.stream = [] if stream is None else stream
+        self.render = render
+        self.batch_size = batch_size
+        self.final_path = final_path
+        # set if the worker stops on an error, and raised again from join()
+        self.error = None
+        # enqueue -> render time of recent keys, in seconds
+        self.latencies = deque(maxlen=100000)
+        self.worker = threading.Thread(target=self._consume, daemon=True)
+        self.worker.start()
+
+    def on_press(self, key):
+        letter = str(key)
+        self.events.put((letter, time.perf_counter()))
+        # stop the listener; the worker finishes up when it reaches ESC. if the
+        # worker has died, nothing would be typed, so stop listening too
+        if letter == "Key.esc" or not self.worker.is_alive():
+            return False
+
+    def _consume(self):
+        # whatever happens, the log is closed and the final stream written out
+        try:
+            done = False
+            while not done:
+                batch = [self.events.get()]
+                while len(batch) < self.batch_size and not self.events.empty():
+                    batch.append(self.events.get())
+                updates, stamps = [], []
+                for letter, stamp in batch:
+                    update = process_key(letter, self.stream, self.log)
+                    if update is None:
+                        done = True
+                        break
+                    updates.append(update)
+                    stamps.append(stamp)
+                self.render(''.join(updates))
+                rendered = time.perf_counter()
+                self.latencies.extend(rendered - stamp for stamp in stamps)
+        except Exception as error:
+            self.error = error
+        finally:
+            finish(self.stream, self.log, self.final_path)
+
+    def join(self):
+        self.worker.join()
+        if self.error is not None:
+            raise RuntimeError("the key worker stopped early") from self.error
+
+    def percentiles(self, qs=(50, 90, 99, 100)):
+        # enqueue -> render latency percentiles, in milliseconds
+        if not self.latencies:
+            return {q: 0.0 for q in qs}
+        values = np.percentile(np.fromiter(self.latencies, dtype=np.float64), qs) * 1000
+        return dict(zip(qs, values.tolist()))
+
+def key_events(text):
+    # turn text into the key names pynput would report for it
+    named = {" ": "Key.space", "\n": "Key.enter", "\b": "Key.backspace"}
+    for char in text:
+        yield named.get(char) or repr(char)
+
+def report(pipeline):
+    stats = "  ".join(f"p{q}={ms:.3f}ms" for q, ms in pipeline.percentiles().items())
+    print(f"\n{len(pipeline.latencies)} key(s), enqueue -> render latency: {stats}", file=sys.stderr)
+
+def main(args):
+    pipeline = KeyPipeline(BufferedLog(args.log), batch_size=args.batch_size, final_path=args.log_final)
+
+    # headless: feed the characters of a file in as synthetic key events
+    if args.feed is not None:
+        with open(args.feed, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for key in key_events(text):
+            pipeline.on_press(key)
+            if args.rate:
+                time.sleep(1 / args.rate)
+        pipeline.on_press("Key.esc")
+        pipeline.join()
+        report(pipeline)
+        return
+
+    from pynput.keyboard import Listener
     print("Begin typing")
-    with Listener(on_press=write_to_log) as l:
-    	l.join()
+    with Listener(on_press=pipeline.on_press) as l:
+        l.join()
+    pipeline.join()
+    report(pipeline)
 
 if __name__ == "__main__":
-    main()
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--feed',
+        type=str,
+        help="run headless, typing the characters of this file instead of reading the keyboard"
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=0,
+        help="keys per second to feed at (0 = as fast as possible)"
+    )
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=256,
+        help="most keys to process per screen update"
+    )
+    parser.add_argument(
+        '--log',
+        type=str,
+        default="log.txt"
+    )
+    parser.add_argument(
+        '--log_final',
+        type=str,
+        default="log_final.txt"
+    )
+    args = parser.parse_args()
+    main(args)
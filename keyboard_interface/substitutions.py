@@ -0,0 +1,150 @@
+import os, re, json, random, unicodedata
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# lowest and highest code points that are substituted
+FIRST_KEY, LAST_KEY = 0x10, 0xFF
+# one slot per code point up to LAST_KEY; everything above shares one empty slot
+TABLE_SIZE = LAST_KEY + 2
+
+def load_confusables(path=os.path.join(DATA_DIR, "unicode_confusables.json")):
+    # compile the confusables once into code point -> substitute characters, so
+    # a keystroke is a single dict lookup instead of hex string juggling
+    with open(path, 'r') as f:
+        confusables = json.load(f)
+    # remove confusables whose base forms need to be compiled. keystrokes were
+    # looked up as hex(ord(letter)).replace("x", "0"), which only ever matched a
+    # 4 digit key for U+0010-U+00FF, so only those keys are kept
+    return {
+        int(k, 16): tuple(chr(int(v, 16)) for v in subs)
+        for k, subs in confusables.items()
+        if len(k) == 4 and FIRST_KEY <= int(k, 16) <= LAST_KEY
+    }
+
+def load_sub_manifold(path=os.path.join(DATA_DIR, "non_alphanumeric_subs.json")):
+    # a multi-level dictionary that contains various character substitutions for
+    # non-alphanumeric keys
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def homoglyph_sub(letter, table, choice=random.choice):
+    # keys that aren't a single character (e.g. unmapped <vk> codes) pass through
+    if len(letter) != 1:
+        return letter
+    subs = table.get(ord(letter))
+    if subs:
+        return choice(subs)
+    return letter
+
+def combining_form(char):
+    # the combining mark a spacing accent stands for, e.g. ´ -> U+0301. most
+    # spacing accents decompose to a space plus the mark; the rest share a name
+    decomposition = unicodedata.decomposition(char).split()
+    if len(decomposition) == 3 and decomposition[:2] == ['<compat>', '0020']:
+        return chr(int(decomposition[2], 16))
+    name = unicodedata.name(char, "").replace("MODIFIER LETTER ", "")
+    try:
+        return unicodedata.lookup("COMBINING " + name)
+    except KeyError:
+        return None
+
+def pair_key(dead, base):
+    # code points fit in 21 bits, so a (dead key, base) pair packs into one int
+    return ord(dead) << 21 | ord(base)
+
+class Composer:
+    # (dead key, base) -> composed character, compiled once from the modifier
+    # data. pairs the data doesn't list are composed with NFC the first time
+    # they come up and remembered, misses included
+    def __init__(self, sub_manifold):
+        self.table = {}
+        for dead, pairs in sub_manifold['modifier_pairs'].items():
+            for base, composed in pairs.items():
+                self.table[pair_key(dead[1:-1], base[1:-1])] = composed[1:-1]
+        self.marks = {}
+        for dead in sub_manifold['modifier_pairs']:
+            self.marks[dead[1:-1]] = combining_form(dead[1:-1])
+        deads = ''.join(re.escape(dead) for dead in self.marks)
+        self.pattern = re.compile(f"[{deads}][^{deads}]")
+
+    def is_dead(self, char):
+        return char in self.marks
+
+    def compose(self, dead, base):
+        # returns None when the pair doesn't compose
+        if len(dead) != 1 or len(base) != 1 or dead not in self.marks or not base.isalpha():
+            return None
+        key = pair_key(dead, base)
+        if key not in self.table:
+            self.table[key] = self._nfc(dead, base)
+        return self.table[key]
+
+    def _nfc(self, dead, base):
+        mark = self.marks[dead]
+        if mark is None:
+            return None
+        composed = unicodedata.normalize('NFC', base + mark)
+        return composed if len(composed) == 1 else None
+
+    def compose_text(self, text):
+        # compose every dead key that's directly followed by a base it combines with
+        return self.pattern.sub(self._compose_match, text)
+
+    def _compose_match(self, match):
+        pair = match.group()
+        composed = self.compose(pair[0], pair[1])
+        return pair if composed is None else composed
+
+def compile_tables(confusables, sub_manifold):
+    # flatten the confusables into numpy arrays for substituting whole blocks of
+    # text: each code point's substitutes sit at subs[offsets[cp]:offsets[cp] + counts[cp]]
+    offsets = np.zeros(TABLE_SIZE, dtype=np.int32)
+    counts = np.zeros(TABLE_SIZE, dtype=np.uint8)
+    subs = []
+    for cp in sorted(confusables):
+        offsets[cp] = len(subs)
+        counts[cp] = len(confusables[cp])
+        subs.extend(ord(char) for char in confusables[cp])
+    # characters typed by operator keys (space, enter) are never substituted on
+    # the keyboard, so leave them alone here too
+    for char in sub_manifold['operators'].values():
+        if len(char) == 1 and ord(char) < TABLE_SIZE:
+            counts[ord(char)] = 0
+    return offsets, counts, np.array(subs, dtype=np.uint32)
+
+def substitute_array(codepoints, tables, rng):
+    # pick a random substitute for every code point that has one, all at once.
+    # random draws are only made for those code points, so the same seed gives
+    # the same output whatever the chunking
+    offsets, counts, subs = tables
+    slots = np.minimum(codepoints, TABLE_SIZE - 1)
+    n_subs = counts[slots]
+    hits = np.flatnonzero(n_subs)
+    picks = offsets[slots[hits]] + (rng.random(len(hits)) * n_subs[hits]).astype(np.int32)
+    out = codepoints.copy()
+    out[hits] = subs[picks]
+    return out
+
+def substitute_text(text, tables, rng):
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    return substitute_array(codepoints, tables, rng).tobytes().decode('utf-32-le')
+
+def substitute_stream(infile, outfile, tables, rng, chunk_size=1 << 20, composer=None):
+    # read, substitute, and write chunk_size characters at a time, so memory stays
+    # flat however large the input is. with a composer, dead keys are composed
+    # with the character after them first
+    n_chars = 0
+    carry = ""
+    while True:
+        chunk = infile.read(chunk_size)
+        n_chars += len(chunk)
+        text, carry = carry + chunk, ""
+        if composer is not None:
+            # a dead key at the end of a chunk may compose with the start of the next
+            if chunk and composer.is_dead(text[-1]):
+                text, carry = text[:-1], text[-1]
+            text = composer.compose_text(text)
+        if text:
+            outfile.write(substitute_text(text, tables, rng))
+        if not chunk:
+            return n_chars
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+import os
+import shutil
+import tempfile
+from homoglypher.process_data import FontTable
+import numpy as np
+
+# code points fit in 21 bits, so a (DEC, PAIR) pair packs into one integer key
+SHIFT = 21
+MASK = (1 << SHIFT) - 1
+# bytes buffered per pair: a key and a count
+ROW_BYTES = 16
+# fewest rows worth reading from a run at a time when merging
+MIN_BLOCK = 4096
+
+def pack(decs, pairs):
+    """pack (DEC, PAIR) pairs into integer keys that sort like the pairs.
+
+    :param decs: unicode decimals
+    :type decs: numpy array
+    :param pairs: unicode decimals they co-occur with
+    :type pairs: numpy array
+    :returns: keys
+    :rtype: numpy array
+    """
+    return (decs.astype(np.int64) << SHIFT) | pairs.astype(np.int64)
+
+def partition_of(keys, n_partitions):
+    """hash keys into partitions.
+
+    :param keys: packed (DEC, PAIR) keys
+    :type keys: numpy array
+    :param n_partitions: number of partitions
+    :type n_partitions: int
+    :returns: partition of each key
+    :rtype: numpy array
+    """
+    mixed = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((mixed >> np.uint64(40)) % np.uint64(n_partitions)).astype(np.int64)
+
+def sum_sorted(keys, counts):
+    """sort keys and sum the counts of duplicates.
+
+    :param keys: packed (DEC, PAIR) keys
+    :type keys: numpy array
+    :param counts: count for each key
+    :type counts: numpy array
+    :returns: distinct keys, in order, and their summed counts
+    :rtype: tup
+    """
+    if not len(keys):
+        return keys, counts
+    order = np.argsort(keys, kind='stable')
+    keys, counts = keys[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(counts, starts)
+
+class PairAggregator:
+
+    def __init__(self, workdir, memory_mb=512, n_partitions=16):
+        """initialize an external-merge aggregator for co-occurring pairs.
+
+        pairs are buffered in memory. once the buffer reaches the memory
+        budget, it's summed, sorted, split into hash partitions, and spilled
+        to disk as one sorted run per partition. at the end, each partition's
+        runs are merged, in blocks that keep to the same budget
+
+        :param workdir: path, directory to spill runs to
+        :type workdir: str
+        :param memory_mb: memory budget for buffered pairs, in MB
+        :type memory_mb: int
+        :param n_partitions: number of hash partitions
+        :type n_partitions: int
+        """
+        self.workdir = workdir
+        self.max_rows = max(memory_mb * 1024 ** 2 // ROW_BYTES, 1)
+        self.n_partitions = n_partitions
+        self.runs = [[] for _ in range(n_partitions)]
+        self.keys, self.counts = [], []
+        self.buffered = 0
+
+    def add(self, decs, pairs, counts):
+        """buffer pairs, spilling to disk if the buffer is full.
+
+        :param decs: unicode decimals
+        :type decs: numpy array
+        :param pairs: unicode decimals they co-occur with
+        :type pairs: numpy array
+        :param counts: co-occurrence counts
+        :type counts: numpy array
+        """
+        self.keys.append(pack(decs, pairs))
+        self.counts.append(counts.astype(np.int64))
+        self.buffered += len(counts)
+        if self.buffered >= self.max_rows:
+            self.spill()
+
+    def spill(self):
+        """write the buffer to disk as sorted runs, one per partition."""
+        if not self.buffered:
+            return
+        keys, counts = sum_sorted(np.concatenate(self.keys), np.concatenate(self.counts))
+        self.keys, self.counts = [], []
+        self.buffered = 0
+
+        partitions = partition_of(keys, self.n_partitions)
+        for part in range(self.n_partitions):
+            mask = partitions == part
+            if not mask.any():
+                continue
+            path = os.path.join(self.workdir, f"part{part}_run{len(self.runs[part])}.bin")
+            np.column_stack([keys[mask], counts[mask]]).tofile(path)
+            self.runs[part].append(path)
+
+    def _block_size(self, n_runs):
+        """find how many rows to read from each run at a time.
+
+        a merge holds a block of every run, plus the pairs it's summing and
+        the order it sorts them in, so the runs share a third of the budget
+
+        :param n_runs: number of runs merged at once
+        :type n_runs: int
+        :returns: rows per block
+        :rtype: int
+        """
+        return max(self.max_rows // (3 * n_runs), 1)
+
+    @staticmethod
+    def _read_run(path, block_size):
+        """stream a sorted run from disk.
+
+        :param path: filepath, a spilled run
+        :type path: str
+        :param block_size: rows to read at a time
+        :type block_size: int
+        :returns: blocks of keys and counts, in key order
+        :rtype: generator
+        """
+        with open(path, 'rb') as f:
+            while True:
+                block = np.fromfile(f, dtype=np.int64, count=2 * block_size)
+                if not len(block):
+                    return
+                block = block.reshape(-1, 2)
+                yield block[:, 0], block[:, 1]
+
+    def _merge_runs(self, paths):
+        """merge sorted runs and sum the counts of each pair, a block at a time.
+
+        every round takes what each run has buffered, up to the smallest of
+        their last buffered keys. nothing still on disk can be at or below that
+        key, so those pairs are final. the run the key came from is then used
+        up and reads its next block
+
+        :param paths: filepaths, sorted runs
+        :type paths: list
+        :returns: blocks of distinct keys, in order, and their summed counts
+        :rtype: generator
+        """
+        block_size = self._block_size(len(paths))
+        readers = [self._read_run(path, block_size) for path in paths]
+        buffers = [next(reader, None) for reader in readers]
+        while True:
+            live = [idx for idx, buffer in enumerate(buffers) if buffer is not None]
+            if not live:
+                return
+            bound = min(buffers[idx][0][-1] for idx in live)
+            keys, counts = [], []
+            for idx in live:
+                run_keys, run_counts = buffers[idx]
+                cut = np.searchsorted(run_keys, bound, side='right')
+                keys.append(run_keys[:cut])
+                counts.append(run_counts[:cut])
+                if cut == len(run_keys):
+                    buffers[idx] = next(readers[idx], None)
+                else:
+                    buffers[idx] = run_keys[cut:], run_counts[cut:]
+            yield sum_sorted(np.concatenate(keys), np.concatenate(counts))
+
+    def _fan_in(self, part, runs):
+        """merge a partition's runs into fewer, longer ones until they fit.
+
+        merging too many runs at once would leave each one a block too small
+        to read efficiently, so they're merged a bounded number at a time, in
+        as many passes as it takes
+
+        :param part: the partition
+        :type part: int
+        :param runs: filepaths, the partition's sorted runs
+        :type runs: list
+        :returns: filepaths of the remaining runs
+        :rtype: list
+        """
+        fan_in = max(self.max_rows // (3 * MIN_BLOCK), 2)
+        n_pass = 0
+        while len(runs) > fan_in:
+            n_pass += 1
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                path = os.path.join(self.workdir, f"part{part}_pass{n_pass}_run{len(merged)}.bin")
+                with open(path, 'wb') as f:
+                    for keys, counts in self._merge_runs(group):
+                        np.column_stack([keys, counts]).tofile(f)
+                for old in group:
+                    os.remove(old)
+                merged.append(path)
+            runs = merged
+        return runs
+
+    def merge(self):
+        """merge every partition's runs and sum the counts of each pair.
+
+        runs are read in numpy blocks sized so that the merge stays within
+        the memory budget, however many runs there are
+
+        :returns: blocks of DEC, PAIR, COUNT rows, sorted within a partition
+        :rtype: generator
+        """
+        self.spill()
+        for part, runs in enumerate(self.runs):
+            for keys, counts in self._merge_runs(self._fan_in(part, runs)):
+                yield np.column_stack([keys >> SHIFT, keys & MASK, counts])
+
+def aggregate(file_list, indir, outfile, memory_mb=512, n_partitions=16, workdir=None):
+    """sum the co-occurring pairs of every font in a directory.
+
+    :param file_list: per-font outputs (.npz, .csv, or .json)
+    :type file_list: list
+    :param indir: location of the files
+    :type indir: str
+    :param outfile: filepath, where to write the DEC, PAIR, COUNT table
+    :type outfile: str
+    :param memory_mb: memory budget for buffered pairs, in MB
+    :type memory_mb: int
+    :param n_partitions: number of hash partitions
+    :type n_partitions: int
+    :param workdir: path, directory for spilled runs (a temporary one if None)
+    :type workdir: str
+    :returns: number of distinct pairs
+    :rtype: int
+    """
+    workdir = tempfile.mkdtemp(dir=workdir)
+    try:
+        aggregator = PairAggregator(workdir, memory_mb, n_partitions)
+        for count, fname in enumerate(file_list, 1):
+            table = FontTable(fname, indir)
+            cells = table.coocc.tocoo()
+            aggregator.add(table.labels[cells.row], table.labels[cells.col], cells.data)
+            if count % 100 == 0:
+                print(f"+ Read {count} of {len(file_list)} font(s)")
+
+        print("+ Merging runs")
+        n_pairs = 0
+        with open(outfile, 'w') as f:
+            f.write("DEC,PAIR,COUNT\n")
+            for block in aggregator.merge():
+                np.savetxt(f, block, fmt='%d', delimiter=',')
+                n_pairs += len(block)
+        return n_pairs
+    finally:
+        shutil.rmtree(workdir)
+
+def main(args):
+    """collect the per-font outputs and sum their co-occurring pairs.
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    fnames = sorted(
+        f for f in os.listdir(args.indir)
+        if f.startswith('.') is False and f.endswith(('.npz', '.csv', '.json'))
+    )
+    n_pairs = aggregate(
+        fnames,
+        args.indir,
+        args.outfile,
+        args.memory_mb,
+        args.n_partitions,
+        args.workdir
+    )
+    print("Wrote", n_pairs, "pair(s)")
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--indir',
+        type=str
+    )
+    parser.add_argument(
+        '--outfile',
+        type=str
+    )
+    parser.add_argument(
+        '--memory_mb',
+        type=int,
+        default=512,
+        help="memory budget for buffered pairs before spilling to disk"
+    )
+    parser.add_argument(
+        '--n_partitions',
+        type=int,
+        default=16,
+        help="hash partitions to spill runs into"
+    )
+    parser.add_argument(
+        '--workdir',
+        type=str,
+        help="directory for spilled runs (defaults to the system temp dir)"
+    )
+    args = parser.parse_args()
+    main(args)
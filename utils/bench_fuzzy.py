@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+import os
+import time
+import numpy as np
+from homoglypher.fuzzy import near_groups, similarity_of
+from find_homoglyphs import get_render_set, sign_chunk
+
+def make_signatures(n, n_bytes=32, dup_rate=0.1, n_flips=4, seed=0):
+    """make random signatures with planted near-duplicates.
+
+    :param n: total number of signatures
+    :type n: int
+    :param n_bytes: bytes per signature
+    :type n_bytes: int
+    :param dup_rate: share of signatures that are near-duplicates of another
+    :type dup_rate: float
+    :param n_flips: bits flipped to make a near-duplicate
+    :type n_flips: int
+    :param seed: random seed
+    :type seed: int
+    :returns: signatures and the planted (original, duplicate) row pairs
+    :rtype: tup
+    """
+    rng = np.random.default_rng(seed)
+    n_dup = int(n * dup_rate)
+    n_base = n - n_dup
+    base = rng.integers(0, 256, (n_base, n_bytes), dtype=np.uint8)
+
+    originals = rng.choice(n_base, size=n_dup, replace=False)
+    bits = np.unpackbits(base[originals], axis=1)
+    rows = np.arange(n_dup)
+    for _ in range(n_flips):
+        bits[rows, rng.integers(0, n_bytes * 8, n_dup)] ^= 1
+    dups = np.packbits(bits, axis=1)
+
+    sigs = np.vstack([base, dups])
+    planted = np.column_stack([originals, np.arange(n_base, n)])
+    return sigs, planted
+
+def render_signatures(typeface, size, grid=16):
+    """sign every distinct glyph bitmap in a font.
+
+    :param typeface: filepath, a typeface to use
+    :type typeface: str
+    :param size: size to draw
+    :type size: int
+    :param grid: width and height of the signature thumbnail
+    :type grid: int
+    :returns: signatures, one per distinct bitmap, and the characters drawn
+        with each
+    :rtype: tup
+    """
+    codepoints, _ = get_render_set(typeface, outline_pass=False)
+    sigs, chars = {}, {}
+    for dec, key, sig in sign_chunk(codepoints, typeface, size, grid=grid):
+        if sig is None:
+            continue
+        sigs[key] = sig
+        chars[key] = chars.get(key, "") + chr(dec)
+    keys = list(sigs)
+    return np.vstack([sigs[key] for key in keys]), [chars[key] for key in keys]
+
+def bench_fonts(args):
+    """time near-duplicate grouping on the glyphs of real fonts.
+
+    besides speed, reports the largest group and the least alike pair inside
+    any group, which should never fall below the threshold
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    print("FONT\tN\tSECONDS\tGROUPS\tLARGEST\tMIN_SIMILARITY\tLARGEST_GROUP")
+    for typeface in args.fonts:
+        sigs, chars = render_signatures(typeface, args.size)
+        start = time.perf_counter()
+        groups = near_groups(sigs, args.similarity)
+        elapsed = time.perf_counter() - start
+
+        worst = 1.0
+        for group in groups:
+            scores = similarity_of(sigs[group][:, None], sigs[group][None])
+            worst = min(worst, float(scores.min()))
+        largest = max(groups, key=len) if groups else []
+        print(
+            f"{os.path.basename(typeface)}\t{len(sigs)}\t{elapsed:.2f}\t{len(groups)}\t"
+            f"{len(largest)}\t{worst:.3f}\t{' '.join(chars[idx] for idx in largest)}"
+        )
+
+def main(args):
+    """time near-duplicate grouping at increasing corpus sizes.
+
+    with fonts, the glyphs of each font are grouped instead of random
+    signatures
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    if args.fonts:
+        bench_fonts(args)
+        return
+    print("N\tSECONDS\tGROUPS\tRECALL")
+    for n in args.sizes:
+        sigs, planted = make_signatures(n)
+        start = time.perf_counter()
+        groups = near_groups(sigs, args.similarity)
+        elapsed = time.perf_counter() - start
+
+        labels = np.full(n, -1)
+        for idx, group in enumerate(groups):
+            labels[group] = idx
+        found = labels[planted[:, 0]] == labels[planted[:, 1]]
+        found &= labels[planted[:, 0]] >= 0
+        print(f"{n}\t{elapsed:.2f}\t{len(groups)}\t{found.mean():.4f}")
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        '--similarity',
+        type=float,
+        default=0.95
+    )
+    parser.add_argument(
+        '--fonts',
+        type=str,
+        nargs='+',
+        help="font files (.ttf, .otf) to render and group instead of random signatures"
+    )
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=10,
+        help="size to draw fonts at"
+    )
+    args = parser.parse_args()
+    main(args)
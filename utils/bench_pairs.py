@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+from homoglypher.process_data import groups_to_coocc, save_coocc
+from aggregate_pairs import aggregate
+import pandas as pd
+import numpy as np
+
+# the awk sum from the old combine_pairs.sh
+AWK_SUM = """BEGIN{FS=OFS=","}
+     NR==1{print; next}
+          {q=$3;$3="~"; if(!($0 in a)) b[++c]=$0; a[$0]+=q}
+     END  {for(k=1;k<=c;k++) {sub("~",a[b[k]],b[k]); print b[k]}}"""
+
+def make_fonts(outdir, n_fonts, n_chars=1000, pool=20000, group_size=3, dense=True, seed=0):
+    """write synthetic per-font outputs as sparse (.npz) and dense (.csv) files.
+
+    :param outdir: path, directory to write to
+    :type outdir: str
+    :param n_fonts: number of fonts
+    :type n_fonts: int
+    :param n_chars: characters per font
+    :type n_chars: int
+    :param pool: code points the fonts draw their characters from
+    :type pool: int
+    :param group_size: characters per homoglyph group
+    :type group_size: int
+    :param dense: whether to write dense tables too
+    :type dense: bool
+    :param seed: random seed
+    :type seed: int
+    :returns: directories of sparse and dense files
+    :rtype: tup
+    """
+    rng = np.random.default_rng(seed)
+    sparse_dir, dense_dir = os.path.join(outdir, "npz"), os.path.join(outdir, "csv")
+    os.makedirs(sparse_dir)
+    os.makedirs(dense_dir)
+    for idx in range(n_fonts):
+        decs = rng.choice(pool, size=n_chars - n_chars % group_size, replace=False)
+        labels, coocc = groups_to_coocc(decs.reshape(-1, group_size))
+        save_coocc(os.path.join(sparse_dir, f"font{idx}.npz"), labels, coocc)
+        if dense:
+            table = pd.DataFrame(coocc.toarray(), index=labels, columns=labels)
+            table.to_csv(os.path.join(dense_dir, f"font{idx}.csv"))
+    return sparse_dir, dense_dir
+
+def legacy_aggregate(indir, workdir):
+    """stack every dense table and sum the pairs with awk, as the old tools did.
+
+    :param indir: path, directory of dense co-occurrence tables
+    :type indir: str
+    :param workdir: path, directory for intermediate files
+    :type workdir: str
+    :returns: filepath of the summed pairs
+    :rtype: str
+    """
+    stacked = []
+    for f in sorted(os.listdir(indir)):
+        df = pd.read_csv(os.path.join(indir, f), index_col=0)
+        df = (
+            df
+            .stack()
+            .to_frame()
+            .reset_index()
+            .rename(columns={'level_0': 'DEC', 'level_1': 'PAIR', 0: 'COUNT'})
+        )
+        outpath = os.path.join(workdir, f)
+        df.to_csv(outpath, index=False, header=False)
+        stacked.append(outpath)
+
+    to_sum = os.path.join(workdir, "to_sum.csv")
+    with open(to_sum, 'w') as out:
+        out.write("DEC,PAIR,COUNT\n")
+        for path in stacked:
+            with open(path, 'r') as f:
+                shutil.copyfileobj(f, out)
+    final = os.path.join(workdir, "final_pairs.csv")
+    with open(final, 'w') as out:
+        subprocess.run(["awk", AWK_SUM, to_sum], stdout=out, check=True)
+    return final
+
+def main(args):
+    """time the external-merge aggregator against the old stack + awk tools.
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    print("FONTS\tAGGREGATE\tLEGACY\tPAIRS")
+    for n_fonts in args.n_fonts:
+        with tempfile.TemporaryDirectory() as tmp:
+            run_legacy = n_fonts <= args.legacy_max
+            sparse_dir, dense_dir = make_fonts(tmp, n_fonts, args.n_chars, dense=run_legacy)
+            fnames = sorted(os.listdir(sparse_dir))
+            outfile = os.path.join(tmp, "pairs.csv")
+
+            start = time.perf_counter()
+            n_pairs = aggregate(fnames, sparse_dir, outfile, args.memory_mb)
+            elapsed = time.perf_counter() - start
+
+            legacy = "-"
+            if run_legacy:
+                workdir = os.path.join(tmp, "legacy")
+                os.makedirs(workdir)
+                start = time.perf_counter()
+                final = legacy_aggregate(dense_dir, workdir)
+                legacy = f"{time.perf_counter() - start:.2f}"
+
+                # the old tools also count zero cells; compare the nonzero ones
+                old = pd.read_csv(final)
+                old = old[old['COUNT'] > 0].sort_values(['DEC', 'PAIR'])
+                new = pd.read_csv(outfile).sort_values(['DEC', 'PAIR'])
+                assert np.array_equal(old.to_numpy(), new.to_numpy())
+
+            print(f"{n_fonts}\t{elapsed:.2f}\t\t{legacy}\t{n_pairs}")
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--n_fonts',
+        type=int,
+        nargs='+',
+        default=[10, 100, 1000]
+    )
+    parser.add_argument(
+        '--n_chars',
+        type=int,
+        default=1000,
+        help="characters per synthetic font"
+    )
+    parser.add_argument(
+        '--memory_mb',
+        type=int,
+        default=64,
+        help="memory budget for the aggregator"
+    )
+    parser.add_argument(
+        '--legacy_max',
+        type=int,
+        default=10,
+        help="largest corpus to time the old tools on (they need ~10 GB at 50)"
+    )
+    args = parser.parse_args()
+    main(args)
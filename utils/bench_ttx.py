@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+import os
+import time
+import tempfile
+from fontTools.ttLib import TTFont
+from homoglypher.ttx import Font
+
+def legacy_load(filename):
+    """load a .ttx dump the way homoglypher.ttx.Font used to.
+
+    every glyph id sends find() back over the whole document, so loading is
+    quadratic in the number of glyphs
+
+    :param filename: filepath, a .ttx file
+    :type filename: str
+    :returns: glyph order, cmap, and glyph nodes
+    :rtype: tup
+    """
+    from bs4 import BeautifulSoup
+    order, cmap, chars = {}, {}, []
+    with open(filename, 'r') as f:
+        soup = BeautifulSoup(f.read(), 'lxml')
+        for item in soup.find_all('glyphid'):
+            order[int(item['id'])] = item['name']
+            data = soup.find('ttglyph', {'name': item['name']})
+            if data:
+                chars.append(data)
+        for item in soup.find_all('map'):
+            cmap[item['name']] = item['code']
+    return order, cmap, chars
+
+def dump_ttx(typeface, outdir, n_glyphs=None):
+    """dump a font (or its first n glyphs) to .ttx.
+
+    :param typeface: filepath, a font to dump
+    :type typeface: str
+    :param outdir: path, directory to write the dump to
+    :type outdir: str
+    :param n_glyphs: number of glyphs to keep, or None for all of them
+    :type n_glyphs: int
+    :returns: filepath of the dump
+    :rtype: str
+    """
+    font = TTFont(typeface)
+    if n_glyphs is not None and n_glyphs < len(font.getGlyphOrder()):
+        from fontTools import subset
+        options = subset.Options()
+        options.notdef_outline = True
+        options.glyph_names = True
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(glyphs=font.getGlyphOrder()[:n_glyphs])
+        subsetter.subset(font)
+    name = os.path.splitext(os.path.basename(typeface))[0]
+    outpath = os.path.join(outdir, f"{name}_{len(font.getGlyphOrder())}.ttx")
+    font.saveXML(outpath, tables=['GlyphOrder', 'cmap', 'glyf'])
+    font.close()
+    return outpath
+
+def main(args):
+    """time the streaming .ttx loader against the old one.
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    print("GLYPHS\tMB\tSTREAMING\tLEGACY")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_glyphs in args.n_glyphs:
+            path = dump_ttx(args.font, tmp, n_glyphs)
+            mb = os.path.getsize(path) / 1024 ** 2
+
+            start = time.perf_counter()
+            font = Font(path)
+            streaming = time.perf_counter() - start
+
+            legacy = "-"
+            if len(font.order) <= args.legacy_max:
+                start = time.perf_counter()
+                order, _, _ = legacy_load(path)
+                legacy = f"{time.perf_counter() - start:.2f}"
+                assert order == font.order
+
+            print(f"{len(font.order)}\t{mb:.1f}\t{streaming:.2f}\t\t{legacy}")
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--font',
+        type=str,
+        help="a .ttf/.otf file to dump, ideally a large (e.g. CJK) one"
+    )
+    parser.add_argument(
+        '--n_glyphs',
+        type=int,
+        nargs='+',
+        default=[500, 1000, 2000, 4000],
+        help="glyph counts to time, by subsetting the font"
+    )
+    parser.add_argument(
+        '--legacy_max',
+        type=int,
+        default=4000,
+        help="largest glyph count to time the old loader on"
+    )
+    args = parser.parse_args()
+    main(args)
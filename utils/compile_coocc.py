@@ -3,41 +3,80 @@
 
 from argparse import ArgumentParser
 import os
-from homoglypher.process_data import FontTable
+from homoglypher.process_data import FontTable, save_coocc
 import pandas as pd
 import numpy as np
+from scipy import sparse
 
-def compile_data(file_list, indir):
+# rows and columns of the accumulator: every unicode code point
+N_CODEPOINTS = 0x110000
+
+def fold(coocc, rows, cols, data):
+    """add a batch of co-occurrence triples to the running sum.
+
+    :param coocc: summed co-occurrences, indexed by unicode decimal
+    :type coocc: scipy sparse matrix
+    :param rows: unicode decimals of the rows
+    :type rows: list
+    :param cols: unicode decimals of the columns
+    :type cols: list
+    :param data: co-occurrence counts
+    :type data: list
+    :returns: the updated sum
+    :rtype: scipy sparse matrix
+    """
+    if not data:
+        return coocc
+    batch = sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(N_CODEPOINTS, N_CODEPOINTS)
+    )
+    return coocc + batch
+
+def compile_data(file_list, indir, batch_size=5_000_000):
     """sum every co-occurrence table in a directory.
 
+    each font's nonzero cells are mapped to unicode decimals and buffered; once
+    the buffer holds batch_size cells it's folded into a sparse sum. memory is
+    bounded by the number of distinct character pairs, not the number of
+    characters squared
+
     :param file_list: list of tables
     :type file_list: list
     :param indir: name of the input directory
     :type indir: str
-    :returns: metadata for the fonts, summed co-occurrence table
-    :rtype: pandas dataframe
+    :param batch_size: cells to buffer before adding them to the sum
+    :type batch_size: int
+    :returns: metadata for the fonts, unicode decimal labels, and the summed
+        co-occurrences
+    :rtype: tup
     """
-    records = pd.DataFrame()
-    coocc = pd.DataFrame()
-    for table in file_list:
-        table = FontTable(table, indir)
-        records = records.append(table.record)
-        coocc = coocc.add(table.coocc, fill_value=0)
-    return records, coocc
+    records = []
+    coocc = sparse.csr_matrix((N_CODEPOINTS, N_CODEPOINTS), dtype=np.int64)
+    rows, cols, data = [], [], []
+    buffered = 0
+    for count, fname in enumerate(file_list, 1):
+        table = FontTable(fname, indir)
+        records.append(table.record)
 
-def reformat_coocc(coocc):
-    """reformat the co-occurrence table to maintain proper order.
+        cells = table.coocc.tocoo()
+        rows.append(table.labels[cells.row])
+        cols.append(table.labels[cells.col])
+        data.append(cells.data.astype(np.int64))
+        buffered += cells.nnz
+        if buffered >= batch_size:
+            coocc = fold(coocc, rows, cols, data)
+            rows, cols, data = [], [], []
+            buffered = 0
+        if count % 100 == 0:
+            print(f"+ Summed {count} of {len(file_list)} table(s)")
+    coocc = fold(coocc, rows, cols, data)
 
-    :param coocc: summed co-occurrence table
-    :type cooc: pandas dataframe
-    :returns: reformatted co-occurrence table
-    :rtype: pandas dataframe
-    """
-    reorder = [str(c) for c in coocc.index]
-    coocc = coocc.reindex(columns=reorder)
-    coocc.columns = coocc.columns.astype(int)
-    coocc = coocc.fillna(0)
-    return coocc
+    # keep only the code points that co-occur with something
+    labels = np.flatnonzero(coocc.getnnz(axis=1))
+    coocc = coocc[labels][:, labels]
+    records = pd.concat(records) if records else pd.DataFrame()
+    return records, labels, coocc
 
 def main(args):
     """stream in a list of co-occurrence tables and sum them.
@@ -45,13 +84,16 @@ def main(args):
     :param args: command line arguments
     :type args: namespace arguments
     """
-    fnames = os.listdir(args.indir)
+    fnames = sorted(
+        f for f in os.listdir(args.indir)
+        if f.startswith('.') is False and f.endswith(('.npz', '.csv', '.json'))
+    )
 
-    records, coocc = compile_data(fnames, args.indir)
-    coocc = reformat_coocc(coocc)
+    records, labels, coocc = compile_data(fnames, args.indir, args.batch_size)
 
-    records.to_csv(os.path.join(args.outdir), "font_metadata.csv"))
-    coocc.to_csv(os.path.join(args.outdir), "fond_coocc.csv"))
+    os.makedirs(args.outdir, exist_ok=True)
+    records.to_csv(os.path.join(args.outdir, "font_metadata.csv"))
+    save_coocc(os.path.join(args.outdir, "font_coocc.npz"), labels, coocc)
 
 if __name__ == '__main__':
     parser = ArgumentParser()
@@ -63,5 +105,11 @@ if __name__ == '__main__':
         '--outdir',
         type=str
     )
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=5_000_000,
+        help="co-occurrence cells to buffer before adding them to the sum"
+    )
     args = parser.parse_args()
     main(args)
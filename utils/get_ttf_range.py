@@ -3,54 +3,51 @@
 
 from argparse import ArgumentParser
 import glob
-import re
-import subprocess
-from collections import Counter
+import multiprocessing
+from fontTools.ttLib import TTFont
 import pandas as pd
+import numpy as np
+
+N_CODEPOINTS = 0x110000
 
 def get_range(ttf):
-    """use the formatted output of `fc-query` to find the character range of a ttf.
+    """read the character range of a ttf from its cmap, as sorted intervals.
 
     :param ttf: path to a ttf file
     :type ttf: str
-    :returns: a block of whitespace-separated hex ranges
-    :rtype: str
-    """ 
-    to_run = ["fc-query", "--format='%{charset}\n'", ttf]
-    result = subprocess.run(to_run, stdout=subprocess.PIPE)
-    stdout = result.stdout.decode('ascii')
+    :returns: start and (exclusive) end decimals of each run of consecutive
+        code points
+    :rtype: tup
+    """
     # some files have multiple styles stored inside them. we take the first
-    stdout = stdout.split("\n")
-    return ''.join(stdout[0])
+    font = TTFont(ttf, lazy=True, fontNumber=0)
+    cmap = font.getBestCmap() or {}
+    font.close()
 
-def expand_range(r):
-    """expand the hex ranges to include every decimal therein.
+    decs = np.array(sorted(dec for dec in cmap if dec < N_CODEPOINTS), dtype=np.int64)
+    if not len(decs):
+        return decs, decs
+    breaks = np.flatnonzero(np.diff(decs) > 1) + 1
+    starts = decs[np.r_[0, breaks]]
+    ends = decs[np.r_[breaks - 1, len(decs) - 1]] + 1
+    return starts, ends
 
-    :param r: a hex range from a ttf
-    :type r: str
-    :returns: every decimal within a range
-    :rtype: list
-    """
-    # split on whitespace
-    r = [i for i in r.split()]
-    # remove stray apostrophes
-    r = [re.sub("\'", "", i) for i in r]
+def count_coverage(ranges):
+    """count how many fonts cover each code point.
 
-    # build a buffer for the range, convert start and end to integers, get decimals
-    whole_range = []
-    for i in r:
-        i = i.split("-")
-        if len(i) > 1:
-            start, end = int(i[0], 16), int(i[1], 16)
-            for j in list(range(start, end)):
-                whole_range.append(j)
-        elif i != ['']:
-            i = int(i[0], 16)
-            whole_range.append(i)
-        else:
-            continue
+    every interval adds one at its start and takes one away at its end; a
+    running sum over the code space then gives the counts
 
-    return whole_range
+    :param ranges: start and end decimals of each font's intervals
+    :type ranges: iterable
+    :returns: number of fonts covering each unicode decimal
+    :rtype: numpy array
+    """
+    diff = np.zeros(N_CODEPOINTS + 1, dtype=np.int64)
+    for starts, ends in ranges:
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+    return np.cumsum(diff[:-1])
 
 def main(args):
     """collect paths to ttf files, get their ranges, and return a compiled listing.
@@ -58,22 +55,13 @@ def main(args):
     :param args: command line arguments
     :type args: namespace arguments
     """
-    # set up a counter and get the files, then expand the ranges
-    c = Counter()
-    paths = glob.glob(args.indir + "/*.ttf")
-    for ttf in paths:
-        r = get_range(ttf)
-        expanded = expand_range(r)
-        c.update(expanded)
+    paths = sorted(glob.glob(args.indir + "/*.ttf") + glob.glob(args.indir + "/*.otf"))
+    with multiprocessing.Pool(args.n_cores) as pool:
+        counts = count_coverage(pool.imap_unordered(get_range, paths, chunksize=16))
 
     # format into a dataframe
-    df = pd.DataFrame.from_dict(c, orient='index', columns=['COUNT'])
-    df = (
-        df
-        .sort_index()
-        .reset_index()
-        .rename(columns={'index': 'DEC'})
-    )
+    decs = np.flatnonzero(counts)
+    df = pd.DataFrame({'DEC': decs, 'COUNT': counts[decs]})
     # and save
     df.to_csv(args.outfile)
 
@@ -87,5 +75,10 @@ if __name__ == '__main__':
         '--outfile',
         type=str
     )
+    parser.add_argument(
+        '--n_cores',
+        type=int,
+        default=4
+    )
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from argparse import ArgumentParser
+import os
+import glob
+import json
+from homoglypher.manifest import Manifest
+from homoglypher.process_data import FontTable, save_coocc, load_coocc
+from homoglypher.cache import RenderCache
+from find_homoglyphs import run_corpus
+from compile_coocc import fold, N_CODEPOINTS
+from get_ttf_range import get_range
+import pandas as pd
+import numpy as np
+from scipy import sparse
+
+# the corpus totals, kept in the aggregate directory beside the manifest
+TOTALS = ["font_coocc.npz", "font_coverage.csv", "font_metadata.csv"]
+
+def list_fonts(indir):
+    """find the fonts in a directory.
+
+    :param indir: path, directory of .ttf/.otf files
+    :type indir: str
+    :returns: font name--filepath pairs
+    :rtype: dict
+    """
+    paths = sorted(glob.glob(indir + "/*.ttf") + glob.glob(indir + "/*.otf"))
+    return {os.path.basename(path)[:-4]: path for path in paths}
+
+def load_totals(aggdir):
+    """load the summed co-occurrences and coverage counts of a corpus.
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :returns: summed co-occurrences, indexed by unicode decimal, and the number
+        of fonts covering each unicode decimal
+    :rtype: tup
+    """
+    coocc = sparse.csr_matrix((N_CODEPOINTS, N_CODEPOINTS), dtype=np.int64)
+    coverage = np.zeros(N_CODEPOINTS, dtype=np.int64)
+    coocc_path = os.path.join(aggdir, "font_coocc.npz")
+    if os.path.exists(coocc_path):
+        labels, trimmed = load_coocc(coocc_path)
+        cells = trimmed.tocoo()
+        coocc = fold(coocc, [labels[cells.row]], [labels[cells.col]], [cells.data.astype(np.int64)])
+    coverage_path = os.path.join(aggdir, "font_coverage.csv")
+    if os.path.exists(coverage_path):
+        df = pd.read_csv(coverage_path, index_col=0)
+        coverage[df['DEC'].to_numpy()] = df['COUNT'].to_numpy()
+    return coocc, coverage
+
+def staged(path):
+    """find where to write a file before it's moved into place.
+
+    the temporary file is hidden and keeps the extension, so numpy doesn't add
+    another one
+
+    :param path: filepath, where the file belongs
+    :type path: str
+    :returns: filepath of the temporary file
+    :rtype: str
+    """
+    dirname, basename = os.path.split(path)
+    root, ext = os.path.splitext(basename)
+    return os.path.join(dirname, "." + root + ".tmp" + ext)
+
+def stage_totals(aggdir, coocc, coverage, manifest):
+    """write the summed co-occurrences, coverage counts, and font metadata.
+
+    each goes to a temporary file, to be moved into place by commit_update()
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :param coocc: summed co-occurrences, indexed by unicode decimal
+    :type coocc: scipy sparse matrix
+    :param coverage: number of fonts covering each unicode decimal
+    :type coverage: numpy array
+    :param manifest: the fonts in the corpus
+    :type manifest: Manifest
+    :returns: temporary filepath--final filepath pairs
+    :rtype: list
+    """
+    paths = [os.path.join(aggdir, name) for name in TOTALS]
+    coocc_tmp, coverage_tmp, metadata_tmp = [staged(path) for path in paths]
+
+    # keep only the code points that co-occur with something
+    labels = np.flatnonzero(coocc.getnnz(axis=1))
+    save_coocc(coocc_tmp, labels, coocc[labels][:, labels])
+
+    decs = np.flatnonzero(coverage)
+    df = pd.DataFrame({'DEC': decs, 'COUNT': coverage[decs]})
+    df.to_csv(coverage_tmp)
+
+    records = pd.DataFrame.from_dict(
+        {name: entry['record'] for name, entry in manifest.fonts.items()},
+        orient='index',
+        columns=['BASE', 'STYLE', 'N_DEC', 'N_HOMOGLYPH']
+    )
+    records.sort_index().to_csv(metadata_tmp)
+    return list(zip([coocc_tmp, coverage_tmp, metadata_tmp], paths))
+
+def journal_path(aggdir):
+    """find where a committed update's pending file moves are kept.
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :returns: filepath of the journal (.json)
+    :rtype: str
+    """
+    return os.path.join(aggdir, ".update.json")
+
+def commit_update(aggdir, replace, remove):
+    """commit an update whose files are all staged, then apply it.
+
+    writing the journal is the commit: until it exists, the old totals,
+    manifest, and contributions stand untouched. once it does, a crash
+    partway through only leaves moves for finish_update() to redo
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :param replace: temporary filepath--final filepath pairs
+    :type replace: list
+    :param remove: filepaths to delete
+    :type remove: list
+    """
+    path = journal_path(aggdir)
+    tmp = staged(path)
+    with open(tmp, 'w') as f:
+        json.dump({'replace': replace, 'remove': remove}, f)
+    os.replace(tmp, path)
+    finish_update(aggdir)
+
+def finish_update(aggdir):
+    """apply the rest of an update that was committed but cut short.
+
+    every step can be run again safely: a temporary file that's gone has
+    already been moved into place, and a file that's gone is already deleted
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :returns: whether there was an update to finish
+    :rtype: bool
+    """
+    path = journal_path(aggdir)
+    if not os.path.exists(path):
+        return False
+    with open(path, 'r') as f:
+        journal = json.load(f)
+    for tmp, final in journal['replace']:
+        if os.path.exists(tmp):
+            os.replace(tmp, final)
+    for stale in journal['remove']:
+        if os.path.exists(stale):
+            os.remove(stale)
+    os.remove(path)
+    return True
+
+def contribution_path(aggdir, name):
+    """find where a font's contribution to the totals is kept.
+
+    :param aggdir: path, directory of aggregate outputs
+    :type aggdir: str
+    :param name: name of the font
+    :type name: str
+    :returns: filepath of the contribution (.npz)
+    :rtype: str
+    """
+    return os.path.join(aggdir, ".contributions", name + ".npz")
+
+def measure(name, typeface, outdir, fmt):
+    """find what a font adds to the totals.
+
+    :param name: name of the font
+    :type name: str
+    :param typeface: filepath, the font file
+    :type typeface: str
+    :param outdir: path, directory of per-font outputs
+    :type outdir: str
+    :param fmt: format of the per-font outputs
+    :type fmt: str
+    :returns: the font's co-occurrences, its cmap intervals, and its metadata row
+    :rtype: tup
+    """
+    table = FontTable(name + "." + fmt, outdir)
+    cells = table.coocc.tocoo()
+    coocc = (table.labels[cells.row], table.labels[cells.col], cells.data.astype(np.int64))
+    record = table.record.iloc[0].to_dict()
+    record = {
+        'BASE': record['BASE'],
+        'STYLE': record['STYLE'],
+        'N_DEC': int(record['N_DEC']),
+        'N_HOMOGLYPH': int(record['N_HOMOGLYPH'])
+    }
+    return coocc, get_range(typeface), record
+
+def save_contribution(path, coocc, ranges):
+    """keep a font's contribution, so it can be taken out of the totals later.
+
+    :param path: filepath, where to save the contribution (.npz)
+    :type path: str
+    :param coocc: unicode decimals of the rows and columns, and the counts
+    :type coocc: tup
+    :param ranges: start and end decimals of the font's cmap intervals
+    :type ranges: tup
+    """
+    rows, cols, data = coocc
+    starts, ends = ranges
+    np.savez_compressed(path, rows=rows, cols=cols, data=data, starts=starts, ends=ends)
+
+def load_contribution(path):
+    """load a font's contribution to the totals.
+
+    :param path: filepath, a contribution saved with save_contribution()
+    :type path: str
+    :returns: the font's co-occurrences and cmap intervals
+    :rtype: tup
+    """
+    with np.load(path) as npz:
+        return (npz['rows'], npz['cols'], npz['data']), (npz['starts'], npz['ends'])
+
+def apply_changes(coocc, coverage, removed, added):
+    """take old contributions out of the totals and put new ones in.
+
+    :param coocc: summed co-occurrences, indexed by unicode decimal
+    :type coocc: scipy sparse matrix
+    :param coverage: number of fonts covering each unicode decimal
+    :type coverage: numpy array
+    :param removed: contributions to take out
+    :type removed: list
+    :param added: contributions to put in
+    :type added: list
+    :returns: the updated co-occurrences and coverage counts
+    :rtype: tup
+    """
+    rows, cols, data = [], [], []
+    diff = np.zeros(N_CODEPOINTS + 1, dtype=np.int64)
+    for sign, contributions in ((-1, removed), (1, added)):
+        for (row, col, counts), (starts, ends) in contributions:
+            rows.append(row)
+            cols.append(col)
+            data.append(sign * counts)
+            np.add.at(diff, starts, sign)
+            np.add.at(diff, ends, -sign)
+    coocc = fold(coocc, rows, cols, data)
+    coocc.eliminate_zeros()
+    return coocc, coverage + np.cumsum(diff[:-1])
+
+def main(args):
+    """bring a corpus's per-font outputs and totals up to date with its fonts.
+
+    fonts are compared to the manifest by content hash. only added and changed
+    fonts are rendered; the old contributions of changed and removed fonts are
+    subtracted from the totals and the new ones added. the new totals, manifest,
+    and contributions are all staged first and then committed together, so a
+    crash leaves either the old corpus or one that the next run finishes
+
+    :param args: command line arguments
+    :type args: namespace arguments
+    """
+    os.makedirs(os.path.join(args.aggdir, ".contributions"), exist_ok=True)
+    if finish_update(args.aggdir):
+        print("+ Finished an update that was cut short")
+    manifest_path = os.path.join(args.aggdir, "manifest.json")
+    # totals without a manifest can't be told apart from what's in them, so
+    # patching them would count fonts twice
+    if not os.path.exists(manifest_path) and any(
+        os.path.exists(os.path.join(args.aggdir, name)) for name in TOTALS
+    ):
+        raise ValueError(
+            f"{args.aggdir} has totals but no manifest. Remove them to rebuild the corpus from scratch"
+        )
+    manifest = Manifest(manifest_path)
+    settings = {
+        'size': args.size,
+        'mode': args.mode,
+        'full_scan': args.full_scan,
+        'outline_pass': not args.no_outline_pass,
+        'format': args.format
+    }
+    fonts = list_fonts(args.indir)
+    added, changed, removed, fingerprints = manifest.diff(fonts, settings)
+    print(
+        len(fonts) - len(added) - len(changed), "font(s) unchanged.",
+        "Adding", len(added), "| updating", len(changed), "| removing", len(removed)
+    )
+    if not (added or changed or removed):
+        return
+    # a font whose contribution is gone can't be subtracted from the totals, so 
+    # it would be counted twice
+    for name in changed + removed:
+        path = contribution_path(args.aggdir, name)
+        if not os.path.exists(path):
+            raise ValueError(
+                f"{name} is in the manifest but {path} is missing. Remove {args.aggdir} to rebuild the corpus from scratch"
+            )
+
+    to_render = added + changed
+    cache = None
+    if args.cache_dir is not None:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 ** 2)
+    if to_render:
+        failed = run_corpus(
+            [(name, fonts[name]) for name in to_render],
+            args.outdir,
+            [(args.size, args.mode)],
+            n_cores=args.n_cores,
+            full_scan=args.full_scan,
+            chunksize=args.chunksize,
+            fmt=args.format,
+            outline_pass=not args.no_outline_pass,
+            cache=cache
+        )
+        # fonts that failed keep their old entries, so the next run tries them again
+        if failed:
+            print(len(failed), "font(s) failed and are left out of this update")
+            to_render = [name for name in to_render if name not in failed]
+            changed = [name for name in changed if name not in failed]
+
+    old, new = [], []
+    for name in changed + removed:
+        old.append(load_contribution(contribution_path(args.aggdir, name)))
+    measured = {}
+    for name in to_render:
+        coocc, ranges, record = measure(name, fonts[name], args.outdir, args.format)
+        measured[name] = (coocc, ranges, record)
+        new.append((coocc, ranges))
+
+    coocc, coverage = load_totals(args.aggdir)
+    coocc, coverage = apply_changes(coocc, coverage, old, new)
+
+    replace, remove = [], []
+    for name in removed:
+        manifest.remove(name)
+        remove.append(contribution_path(args.aggdir, name))
+        remove.append(os.path.join(args.outdir, name + "." + args.format))
+    for name, (font_coocc, ranges, record) in measured.items():
+        path = contribution_path(args.aggdir, name)
+        save_contribution(staged(path), font_coocc, ranges)
+        replace.append((staged(path), path))
+        manifest.add(name, os.path.basename(fonts[name]), fingerprints[name], record)
+    manifest.settings = settings
+
+    replace.extend(stage_totals(args.aggdir, coocc, coverage, manifest))
+    manifest.save(staged(manifest.path))
+    replace.append((staged(manifest.path), manifest.path))
+    commit_update(args.aggdir, replace, remove)
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument(
+        '--indir',
+        type=str,
+        help="directory of .ttf/.otf files"
+    )
+    parser.add_argument(
+        '--outdir',
+        type=str,
+        help="directory of per-font outputs"
+    )
+    parser.add_argument(
+        '--aggdir',
+        type=str,
+        help="directory of the totals, the manifest, and each font's contribution"
+    )
+    parser.add_argument(
+        '--n_cores',
+        type=int,
+        default=4
+    )
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--mode',
+        type=str,
+        choices=['L', '1'],
+        default='L',
+        help="antialiased (L) or aliased (1) rendering"
+    )
+    parser.add_argument(
+        '--full_scan',
+        action='store_true',
+        help="render every unicode code point instead of the font's cmap"
+    )
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=['npz', 'csv'],
+        default='npz',
+        help="sparse co-occurrences (npz) or a dense co-occurrence table (csv)"
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=2048,
+        help="code points per checkpointed chunk"
+    )
+    parser.add_argument(
+        '--no_outline_pass',
+        action='store_true',
+        help="draw every code point instead of one per identical outline"
+    )
+    parser.add_argument(
+        '--cache_dir',
+        type=str,
+        help="directory to cache bitmap digests in between runs"
+    )
+    parser.add_argument(
+        '--cache_size',
+        type=int,
+        default=1024,
+        help="size in MB the render cache is trimmed back to"
+    )
+    args = parser.parse_args()
+    main(args)